@@ -0,0 +1,61 @@
+#!/usr/bin/python
+# batch conjugation for gato and roco: infinitives in, one record per line out
+import os, sys, json
+
+def words(f):
+	# one infinitive per line, blank lines and #comments are skipped
+	for l in f:
+		l = l.strip()
+		if len(l) > 0 and l[0] != '#': yield l
+
+def header(fields:list, persons:list, scalars:int) -> list:
+	H = ["verb", "translation", "parent"]
+	for i,k in enumerate(fields):
+		if i < scalars: H.append(k)
+		else: H += [f"{k}.{p}" for p in persons]
+	return H
+
+def to_dict(r, fields:list, persons:list) -> dict:
+	s,tr,P,F = r
+	if F is None: return {"verb": s, "error": "not found"}
+	D = {}
+	for k,x in zip(fields, F):
+		D[k] = x if x is None or type(x) is str else dict(zip(persons, x))
+	return {"verb": s, "translation": tr, "parent": P, "forms": D}
+
+def from_dict(D:dict, fields:list, persons:list) -> list:
+	# the forms of to_dict() as a list again
+	F = [D["forms"][k] for k in fields]
+	return [x if x is None or type(x) is str else [x[p] for p in persons] for x in F]
+
+def to_json(r, fields:list, persons:list) -> str:
+	return json.dumps(to_dict(r, fields, persons), ensure_ascii=False)
+
+def to_tsv(r, width:int) -> str:
+	s,tr,P,F = r
+	R = [s, tr or "", P or ""]
+	if F is not None:
+		for x in F:
+			if x is None or type(x) is str: R.append(x or "")
+			else: R += [y or "" for y in x]
+	R += [""] * (width-len(R))
+	return "\t".join(x.replace("\t", " ") for x in R)
+
+def run(f, record, fields:list, persons:list, scalars:int=2, fmt:str="json", jobs:int=None, out=sys.stdout):
+	# record(s) returns (infinitive, translation, parent, forms or None),
+	# forms being a tuple in the order of fields. Output keeps the input
+	# order, work is spread over a process pool of jobs (default: one per
+	# cpu) processes.
+	H = header(fields, persons, scalars)
+	if fmt == "tsv": out.write("\t".join(H) + "\n")
+	def w(R):
+		for r in R:
+			out.write((to_tsv(r, len(H)) if fmt == "tsv" else to_json(r, fields, persons)) + "\n")
+	if jobs is None: jobs = os.cpu_count() or 1
+	if jobs == 1:
+		w(map(record, words(f)))
+	else:
+		from multiprocessing import Pool
+		with Pool(jobs) as P:
+			w(P.imap(record, words(f), 64))
+	out.flush()
@@ -0,0 +1,177 @@
+#!/usr/bin/python
+# benchmarks for gato and roco
+#
+# conj_bench.py [-n rounds] [-s scales] [-p pages] [-o out.json] [-c base.json] [-t threshold]
+#   -n  rounds per benchmark, the best one counts (default 5)
+#   -s  comma separated sizes of the synthetic verb tables, as multiples of
+#       today's tables (default 1,4,16)
+#   -p  directory of saved verbix pages (*.html), default is the roco cache
+#   -o  write the results (ms per benchmark) as JSON
+#   -c  compare with earlier results and fail if anything got slower than
+#       threshold allows (default 0.25 = 25% slower)
+import os, sys, io, json, time, glob, itertools, subprocess, contextlib, tempfile
+import importlib.machinery, importlib.util
+
+HERE = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, HERE)
+import gato_store, roco_store
+import gato_irregular, roco_irregular
+
+PREFIXES = ["re", "des", "con", "pre", "sub", "ex", "entre", "sobre", "contra", "dis", "in", "com"]
+
+def best(f, n:int, setup=None) -> float:
+	# fastest of n runs of f() in ms, setup() is not timed
+	T = []
+	for i in range(n):
+		if setup is not None: setup()
+		t = time.perf_counter()
+		f()
+		T.append(time.perf_counter() - t)
+	return 1000*min(T)
+
+@contextlib.contextmanager
+def quiet():
+	with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+		yield
+
+def cli(lang:str):
+	# the gato or roco script as a module, for its table()
+	p = os.path.join(HERE, lang)
+	L = importlib.machinery.SourceFileLoader(f"{lang}_cli", p)
+	M = importlib.util.module_from_spec(importlib.util.spec_from_loader(L.name, L))
+	L.exec_module(M)
+	return M
+
+def fresh(M):
+	# rebuilds the registry of store module M
+	M.verbs.clear()
+	M.load()
+
+def make(M, s:str, v, p:str):
+	# a verb like v named s, with parent p if v is irregular
+	if M is gato_store:
+		if isinstance(v, gato_irregular.DVerb): return gato_irregular.DVerb(s, v.trans, p, "")
+		return M.Verb(s, v.trans)
+	if isinstance(v, roco_irregular.DVerb): return roco_irregular.DVerb(s, v.trans, v.extend, v.imp_tu, p, {})
+	return M.Verb(s, v.trans, v.extend, v.imp_tu)
+
+def synth(M, k:int):
+	# fills the registry with k times today's verbs, the new ones are
+	# prefixed copies and the irregular ones inherit from the original
+	fresh(M)
+	B = list(M.verbs.items())
+	P = itertools.chain(PREFIXES, ("".join(x) for x in itertools.product(PREFIXES, repeat=2)))
+	while len(M.verbs) < k*len(B):
+		p = next(P)
+		for s,v in B:
+			if len(M.verbs) >= k*len(B): break
+			if p+s not in M.verbs: M.verbs[p+s] = make(M, p+s, v, s)
+
+def chain(M, root:str, depth:int) -> list:
+	# verbs inheriting from each other depth times, root first
+	V = [M.verbs[root]]
+	for i in range(depth):
+		s = "r" + V[-1].full
+		M.verbs[s] = make(M, s, V[-1], V[-1].full)
+		V.append(M.verbs[s])
+	return V
+
+def pages(D:str) -> list:
+	if D is not None:
+		return [(os.path.basename(f)[:-5], open(f, encoding="utf-8").read()) for f in glob.glob(os.path.join(D, "*.html"))]
+	import roco_web
+	if not os.path.exists(roco_web.cache.path): return []
+	return list(roco_web.cache.pages())
+
+def run(n:int, scales:list, D:str) -> dict:
+	R = {}
+	env = dict(os.environ, XDG_RUNTIME_DIR=tempfile.mkdtemp()) # no daemon
+	for lang,M,verb in [("gato", gato_store, "tener"), ("roco", roco_store, "da")]:
+		# cold start, the first run makes sure the store is built
+		cmd = [sys.executable, os.path.join(HERE, lang), verb]
+		def start(): subprocess.run(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+		start()
+		R[f"{lang}.start"] = best(start, n)
+		load = [sys.executable, "-c", f"import {lang}_store as M; M.load()"]
+		R[f"{lang}.start.load"] = best(lambda: subprocess.run(load, cwd=HERE, env=env), n)
+
+		# all paradigms of a fresh registry
+		R[f"{lang}.paradigms"] = best(lambda: [v.paradigm() for v in M.verbs.values()], n, lambda: fresh(M))
+
+		# table() for every verb, against already computed paradigms
+		C = cli(lang)
+		fresh(M)
+		R[f"{lang}.table"] = best(lambda: [C.table(v) for v in M.verbs.values()], n)
+		R[f"{lang}.table.plain"] = best(lambda: [C.table(v, False) for v in M.verbs.values()], n)
+
+		# find() at the end of a 32 deep parent chain, flat() not cached
+		V = chain(M, verb, 32)
+		K = list(V[0].d)
+		def reset():
+			for v in V: v.changed()
+		R[f"{lang}.find.chain32"] = best(lambda: [V[-1].find(k) for k in K], n, reset)
+
+		# lookups, completion and typos on k times today's tables
+		for k in scales:
+			synth(M, k)
+			S = list(M.verbs)[::max(1, len(M.verbs)//200)]
+			R[f"{lang}.x{k}.paradigms"] = best(lambda: [v.paradigm() for v in M.verbs.values()], n, lambda: synth(M, k))
+			path = M.store.path
+			with tempfile.TemporaryDirectory() as T:
+				M.store.path = os.path.join(T, "paradigms.bin")
+				R[f"{lang}.x{k}.build"] = best(M.build, 1)
+				M.verbs.clear() # lookups from the store only
+				M.store.open()
+				R[f"{lang}.x{k}.lookup"] = best(lambda: [M.lookup(s).paradigm() for s in S], n)
+				R[f"{lang}.x{k}.complete"] = best(lambda: [M.complete(s[:3]) for s in S], n)
+				R[f"{lang}.x{k}.suggest"] = best(lambda: [M.suggest(s[1:]) for s in S[:50]], n)
+				M.store.tables = None
+			M.store.path = path
+		fresh(M)
+
+	# roco only: optimize() of all irregulars and parsing saved pages
+	import roco_web
+	fresh(roco_store)
+	I = [(s,v) for s,v in roco_store.verbs.items() if isinstance(v, roco_irregular.DVerb)]
+	def optimize():
+		for s,v in I:
+			roco_irregular.DVerb(s, v.trans, v.extend, v.imp_tu, None, dict(v.d)).optimize()
+	with quiet():
+		R["roco.optimize"] = best(optimize, n)
+	P = pages(D)
+	if len(P) > 0:
+		with quiet():
+			R["roco.parse"] = best(lambda: [roco_web.scrape(v, s) for v,s in P], n) / len(P)
+	return R
+
+def compare(R:dict, B:dict, threshold:float) -> list:
+	# names of the benchmarks that got slower than threshold allows
+	return [k for k in R if k in B and R[k] > B[k]*(1+threshold)]
+
+if __name__ == "__main__":
+	n,scales,D,out,base,threshold = 5,[1,4,16],None,None,None,0.25
+	A = sys.argv[1:]
+	while len(A) > 0:
+		a = A.pop(0)
+		if len(A) == 0: sys.exit(f"missing value for {a}")
+		if a == "-n": n = int(A.pop(0))
+		elif a == "-s": scales = [int(x) for x in A.pop(0).split(",")]
+		elif a == "-p": D = A.pop(0)
+		elif a == "-o": out = A.pop(0)
+		elif a == "-c": base = A.pop(0)
+		elif a == "-t": threshold = float(A.pop(0))
+		else: sys.exit(f"bad argument: {a}")
+
+	R = run(n, scales, D)
+	B = {}
+	if base is not None:
+		with open(base) as F: B = json.load(F)["results"]
+	for k,t in R.items():
+		d = "" if k not in B else f"{100*(t/B[k]-1):+7.1f}%"
+		print(f"{k:24} {t:10.3f} ms {d}")
+	if out is not None:
+		with open(out, "w") as F:
+			json.dump({"time": time.strftime("%Y-%m-%d %H:%M:%S"), "python": sys.version.split()[0],
+				"rounds": n, "results": R}, F, indent=1)
+	if len(bad := compare(R, B, threshold)) > 0:
+		sys.exit(f"slower than {base} by more than {100*threshold:g}%: {', '.join(bad)}")
@@ -0,0 +1,101 @@
+#!/usr/bin/python
+# conjugation daemon for gato and roco: keeps the registry in memory and
+# answers JSON queries on a unix socket and on localhost http
+#
+# Socket: one request per line, {"op": "conj", "arg": "tener"}, answered by
+#   one line {"result": ...} or {"error": "..."}. Connections stay open.
+# HTTP: GET /<op>/<arg>, answered with the result or 404 if there is none.
+# The ops are conj (verb -> paradigm), forms (form -> verbs), list
+# (prefix -> infinitives), suggest (typo -> infinitives) and stamp (the
+# Store.stamp() of the sources the daemon loaded, clients ignore a daemon
+# whose stamp is not the current one).
+import os, json, threading
+
+PORTS = {"gato": 7361, "roco": 7362}
+
+def path(name:str) -> str:
+	d = os.environ.get("XDG_RUNTIME_DIR") or os.path.expanduser(f"~/.cache/{name}")
+	return os.path.join(d, f"{name}.sock")
+
+def port(name:str) -> int:
+	return int(os.environ.get(f"{name.upper()}_PORT", PORTS[name]))
+
+def answer(ops:dict, op:str, arg:str) -> dict:
+	if op not in ops: return {"error": f"unknown op: {op}"}
+	try:
+		return {"result": ops[op](arg)}
+	except Exception as e:
+		return {"error": str(e)}
+
+def serve(name:str, ops:dict):
+	# ops maps op names to functions of one string returning something
+	# json serializable, None meaning not found. Runs until killed.
+	import socketserver, http.server, urllib.parse, signal, sys
+	class Unix(socketserver.StreamRequestHandler):
+		def handle(self):
+			for l in self.rfile:
+				try:
+					q = json.loads(l)
+					r = answer(ops, q.get("op"), q.get("arg", ""))
+				except ValueError as e:
+					r = {"error": f"bad request: {e}"}
+				self.wfile.write(json.dumps(r, ensure_ascii=False).encode() + b"\n")
+				self.wfile.flush()
+	class HTTP(http.server.BaseHTTPRequestHandler):
+		protocol_version = "HTTP/1.1"
+		def do_GET(self):
+			op,_,arg = urllib.parse.urlsplit(self.path).path.strip("/").partition("/")
+			r = answer(ops, op, urllib.parse.unquote(arg))
+			b = json.dumps(r.get("result", r), ensure_ascii=False).encode()
+			self.send_response(200 if r.get("result") is not None else 404)
+			self.send_header("Content-Type", "application/json; charset=utf-8")
+			self.send_header("Content-Length", str(len(b)))
+			self.end_headers()
+			self.wfile.write(b)
+		def log_message(self, *args): pass
+
+	p = path(name)
+	os.makedirs(os.path.dirname(p), 0o700, True)
+	if client(name) is not None: raise SystemExit(f"{name} daemon is already running")
+	if os.path.exists(p): os.remove(p)
+	U = socketserver.ThreadingUnixStreamServer(p, Unix)
+	U.daemon_threads = True
+	H = http.server.ThreadingHTTPServer(("127.0.0.1", port(name)), HTTP)
+	H.daemon_threads = True
+	threading.Thread(target=H.serve_forever, daemon=True).start()
+	print(f"{name} daemon on {p} and http://127.0.0.1:{port(name)}/")
+	signal.signal(signal.SIGTERM, lambda *args: sys.exit(0)) # to clean up below
+	try:
+		U.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		os.remove(p)
+
+class Client:
+	def __init__(self, s):
+		self.s = s
+		self.f = s.makefile("rwb")
+
+	def query(self, op:str, arg:str):
+		# the result, None if there is none or the daemon went away
+		try:
+			self.f.write(json.dumps({"op": op, "arg": arg}, ensure_ascii=False).encode() + b"\n")
+			self.f.flush()
+			r = json.loads(self.f.readline())
+		except (OSError, ValueError):
+			return None
+		return r.get("result")
+
+def client(name:str):
+	# a Client for the running daemon or None
+	p = path(name)
+	if not os.path.exists(p): return None
+	import socket
+	s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+	try:
+		s.connect(p)
+	except OSError:
+		s.close()
+		return None
+	return Client(s)
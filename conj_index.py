@@ -0,0 +1,128 @@
+#!/usr/bin/python
+# suffix search over infinitives for gato and roco
+
+class SuffixTrie:
+	# trie over the reversed words, so words sharing a suffix share a path
+	def __init__(self, W=()):
+		self.root = {}
+		self.n = 0
+		for w in W: self.add(w)
+
+	def add(self, w:str):
+		t = self.root
+		for c in reversed(w): t = t.setdefault(c, {})
+		if None not in t: self.n += 1
+		t[None] = w # None can not clash with a character key
+
+	def __len__(self) -> int:
+		return self.n
+
+	def words(self, t:dict):
+		S = [t]
+		while len(S) > 0:
+			t = S.pop()
+			for c,x in t.items():
+				if c is None: yield x
+				else: S.append(x)
+
+	def common(self, w:str, n:int=1):
+		# (word, length of the common suffix) for all words sharing at least
+		# n trailing characters with w, longest suffix first
+		P = [self.root]
+		for c in reversed(w):
+			t = P[-1].get(c)
+			if t is None: break
+			P.append(t)
+		for m in range(len(P)-1, n-1, -1):
+			# everything below P[m] that was not found further down
+			skip = P[m+1] if m+1 < len(P) else None
+			for c,x in P[m].items():
+				if c is None: yield x,m
+				elif x is not skip:
+					for y in self.words(x): yield y,m
+
+	def ends(self, w:str) -> list:
+		# the words w ends with, longest first, in O(len(w))
+		R = []
+		t = self.root
+		for c in reversed(w):
+			t = t.get(c)
+			if t is None: break
+			if None in t: R.append(t[None])
+		return R[::-1]
+
+	def longest(self, w:str, n:int=1) -> list:
+		# the words with the longest common suffix (at least n) with w
+		R,m = [],None
+		for x,k in self.common(w, n):
+			if x == w: continue
+			if m is not None and k < m: break
+			R.append(x)
+			m = k
+		return R
+
+def distance(a:str, b:str) -> int:
+	# Levenshtein distance
+	if len(a) < len(b): a,b = b,a
+	D = list(range(len(b)+1))
+	for i,x in enumerate(a):
+		p,D[0] = D[0],i+1
+		for j,y in enumerate(b):
+			p,D[j+1] = D[j+1], min(D[j+1]+1, D[j]+1, p + (x != y))
+	return D[-1]
+
+class BKTree:
+	# words by edit distance: every child is at its key's distance from
+	# its parent, so a search within n of w can skip all subtrees whose key
+	# differs from distance(w, node) by more than n
+	def __init__(self, W=()):
+		self.root = None
+		self.C = {} # word -> {distance: child}
+		for w in W: self.add(w)
+
+	def add(self, w:str):
+		if self.root is None:
+			self.root = w
+			self.C[w] = {}
+			return
+		x = self.root
+		while (d := distance(w, x)) > 0:
+			C = self.C[x]
+			if d not in C:
+				C[d] = w
+				self.C[w] = {}
+				return
+			x = C[d]
+
+	def children(self, x:str) -> dict:
+		return self.C[x]
+
+	def search(self, w:str, n:int) -> list:
+		# (distance, word) for all words within n of w, closest first
+		R = []
+		S = [] if self.root is None else [self.root]
+		while len(S) > 0:
+			x = S.pop()
+			d = distance(w, x)
+			if d <= n: R.append((d, x))
+			for k,y in self.children(x).items():
+				if d-n <= k <= d+n: S.append(y)
+		return sorted(R)
+
+	def table(self) -> dict:
+		# for conj_store: word -> "distance child\t...", the root under " "
+		# (conj_store has no empty keys)
+		T = {x: "\t".join(f"{k} {y}" for k,y in C.items()) for x,C in self.C.items()}
+		if self.root is not None: T[" "] = self.root
+		return T
+
+class StoredBKTree(BKTree):
+	# BKTree read from a table() in conj_store, get(key) returns the value
+	def __init__(self, get):
+		self.get = get
+		self.root = get(" ")
+
+	def children(self, x:str) -> dict:
+		s = self.get(x)
+		if not s: return {}
+		return {int(k): y for k,y in (c.split(" ", 1) for c in s.split("\t"))}
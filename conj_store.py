@@ -0,0 +1,176 @@
+#!/usr/bin/python
+# memory-mapped store of fully expanded paradigms for gato and roco
+#
+# File layout:
+#   "CONJ2\n", stamp line, one "<name> <kind> <offset> <count>\n" line per
+#   table, "\n", then the tables. A table is <count> index entries of four
+#   uint32 (key offset, key length, value offset, value length), followed
+#   by the keys and values as utf-8. For kind "s" the entries are sorted by
+#   key and lookups are binary searches, for kind "h" they are an open
+#   addressing hash table (crc32 of the key, linear probing, zeroed entries
+#   are empty) with a power of two size. Nothing has to be parsed when
+#   opening the file.
+import os, mmap, struct, zlib
+
+MAGIC = b"CONJ2\n"
+ENTRY = struct.Struct("<IIII")
+
+# forms are kept as one string per verb: tenses separated by newlines,
+# persons by tabs, missing forms as empty strings
+def pack(F:list) -> str:
+	def p(x): return "" if x is None else x
+	return "\n".join(p(x) if type(x) is str or x is None else "\t".join(p(y) for y in x) for x in F)
+
+def unpack(s:str, scalars:int) -> list:
+	# the first <scalars> entries are single forms, the rest are lists
+	T = s.split("\n")
+	def u(x): return None if x == "" else x
+	return [u(x) for x in T[:scalars]] + [[u(y) for y in x.split("\t")] for x in T[scalars:]]
+
+# records in the "verbs" table: translation, parent, flags and packed forms
+def pack_verb(tr:str, P:str, flags:int, F:list) -> str:
+	return "\x1f".join(("" if tr is None else tr, "" if P is None else P, str(flags), pack(F)))
+
+def unpack_verb(s:str, scalars:int):
+	tr,P,f,F = s.split("\x1f")
+	return (tr or None, P or None, int(f), unpack(F, scalars))
+
+class Table:
+	def __init__(self, mm, offset:int, count:int):
+		self.mm = mm
+		self.offset = offset
+		self.count = count
+
+	def entry(self, i:int):
+		return ENTRY.unpack_from(self.mm, self.offset + i*ENTRY.size)
+
+	def key(self, i:int) -> bytes:
+		ko,kl,vo,vl = self.entry(i)
+		return self.mm[ko:ko+kl]
+
+	def value(self, i:int) -> str:
+		ko,kl,vo,vl = self.entry(i)
+		return self.mm[vo:vo+vl].decode()
+
+	def lower_bound(self, k:bytes) -> int:
+		lo,hi = 0,self.count
+		while lo < hi:
+			m = (lo+hi)//2
+			if self.key(m) < k: lo = m+1
+			else: hi = m
+		return lo
+
+	def get(self, key:str):
+		k = key.encode()
+		i = self.lower_bound(k)
+		if i < self.count and self.key(i) == k: return self.value(i)
+		return None
+
+	def prefixed(self, prefix:str):
+		# yields (key, value) for all keys starting with prefix, in order
+		k = prefix.encode()
+		for i in range(self.lower_bound(k), self.count):
+			kk = self.key(i)
+			if not kk.startswith(k): break
+			yield (kk.decode(), self.value(i))
+
+class HashTable(Table):
+	def get(self, key:str):
+		k = key.encode()
+		mask = self.count-1
+		i = zlib.crc32(k) & mask
+		while True:
+			ko,kl,vo,vl = self.entry(i)
+			if kl == 0: return None
+			if self.mm[ko:ko+kl] == k: return self.mm[vo:vo+vl].decode()
+			i = (i+1) & mask
+
+	def prefixed(self, prefix:str):
+		# Table's would binary search an unordered index
+		raise TypeError("hash tables are not ordered")
+
+def write_tables(f, stamp:str, tables:dict, hashed:set=set()):
+	# tables: name -> dict of str -> str, the ones in hashed are written
+	# as hash tables
+	head = MAGIC + stamp.encode() + b"\n"
+	# the header length depends on the offsets, so reserve fixed width
+	names = list(tables)
+	head_len = len(head) + sum(len(n.encode()) + 25 for n in names) + 1
+	body = bytearray()
+	lines = []
+	for n in names:
+		T = sorted((k.encode(), v.encode()) for k,v in tables[n].items())
+		count = len(T)
+		if n in hashed:
+			count = 1
+			while count < 2*len(T): count *= 2
+		base = head_len + len(body)
+		data = base + count*ENTRY.size
+		index = bytearray(count*ENTRY.size)
+		blob = bytearray()
+		for i,(k,v) in enumerate(T):
+			assert(len(k) > 0)
+			if n in hashed:
+				i = zlib.crc32(k) & (count-1)
+				while index[i*ENTRY.size+4:i*ENTRY.size+8] != bytes(4):
+					i = (i+1) & (count-1)
+			ENTRY.pack_into(index, i*ENTRY.size, data+len(blob), len(k), data+len(blob)+len(k), len(v))
+			blob += k
+			blob += v
+		body += index
+		body += blob
+		kind = b"h" if n in hashed else b"s"
+		lines.append(b"%s %s %010d %010d\n" % (n.encode(), kind, base, count))
+	head += b"".join(lines) + b"\n"
+	assert(len(head) == head_len)
+	f.write(head)
+	f.write(body)
+
+class Store:
+	def __init__(self, name:str, sources:list):
+		self.path = os.path.join(os.path.expanduser(f"~/.cache/{name}/"), "paradigms.bin")
+		self.sources = sources # files the store is generated from
+		self.tables = None
+
+	def stamp(self) -> str:
+		# only stat the sources, importing them is what we want to avoid
+		S = []
+		for f in self.sources:
+			st = os.stat(f)
+			S.append(f"{st.st_mtime_ns}:{st.st_size}")
+		return " ".join(S)
+
+	def open(self) -> bool:
+		# maps the file if it exists and is not stale
+		if self.tables is not None: return True
+		try:
+			with open(self.path, "rb") as f:
+				mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		except (OSError, ValueError):
+			return False
+		lines = []
+		i = len(MAGIC)
+		if mm[:i] != MAGIC: return False
+		while (j := mm.find(b"\n", i)) > i:
+			lines.append(mm[i:j].decode())
+			i = j+1
+		if len(lines) == 0 or lines[0] != self.stamp(): return False
+		self.tables = {}
+		for l in lines[1:]:
+			n,k,o,c = l.split()
+			self.tables[n] = (HashTable if k == "h" else Table)(mm, int(o), int(c))
+		return True
+
+	def get(self, name:str, table:str="verbs"):
+		return self.tables[table].get(name)
+
+	def build(self, tables:dict, hashed:set=set()):
+		# tables: name -> dict of str -> str, "verbs" maps infinitives
+		# to their records
+		self.tables = None
+		os.makedirs(os.path.dirname(self.path), 0o700, True)
+		tmp = f"{self.path}.{os.getpid()}"
+		with open(tmp, "wb") as f:
+			write_tables(f, self.stamp(), tables, hashed)
+		# replace atomically, other invocations might be reading it
+		os.replace(tmp, self.path)
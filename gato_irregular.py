@@ -1,8 +1,21 @@
 #!/usr/bin/python
 from gato_regular import *
-import re
+from conj_index import SuffixTrie
 import sys
 
+# person prefixes of the override keys, in the order of Verb.order()
+PERSONS = {"fs":0, "fp":1, "ss":2, "sv":3, "sp":4, "ts":5, "tp":6}
+VOS     = [0,1,2,3,4,5,6]
+NO_VOS  = [0,1,2,2,4,5,6] # vos == tú
+
+def parse(D:str) -> dict:
+	# "fspr:tengo sspr:tienes" -> {"fspr":"tengo", "sspr":"tienes"}
+	d = {}
+	for x in D.split():
+		k,v = x.split(":", 1)
+		d[k] = v
+	return d
+
 class DVerb(Verb):
 	def __init__(self, v:str, tr:str, p:str, D:str):
 		super().__init__(v, tr)
@@ -13,14 +26,7 @@ class DVerb(Verb):
 			self.parent = (p, p[:len(p)-n], v[:len(v)-n])
 		else:
 			self.parent = None
-		self.d = {}
-		while True:
-			m = re.search(r'^([a-z]+):([^ ]+) ?(.*)$', D)
-			if m is None:
-				assert(re.match(r'^\s*$', D))
-				break
-			self.d[m.group(1)] = m.group(2)
-			D = m.group(3)
+		self.d = parse(D)
 
 	##########################################################################
 	# Helper stuff
@@ -33,51 +39,77 @@ class DVerb(Verb):
 		E = (a, b+"mos", a+"s", c+"is", a, a+"n")
 		return Verb.pad(list(stem + e for e in E))
 	
-	def find(self, key:str):
+	def flat(self) -> dict:
+		# compiles self.d with everything inherited from the parent chain
+		# into {code: [form or None for each person]}, plus the plain keys
+		# (ge, po, rf) as {key: form}
+		if self.F is not None: return self.F
 		global verbs
-		x = self
-		mod = []
-		val = None
-		while True:
-			if key in x.d:
-				val = x.d[key]
-				break
-			if x.parent is None: return None
-			f,r,a = x.parent
+		F = {}
+		if self.parent is not None:
+			f,r,a = self.parent
 			assert(f in verbs)
-			x = verbs[f]
-			mod.append((r,a))
-		for r,a in reversed(mod):
-			assert(val.startswith(r))
-			val = a + val[len(r):]
-		return val.lower()
+			def m(val):
+				if val is None: return None
+				assert(val.startswith(r))
+				return a + val[len(r):]
+			for k,x in verbs[f].flat().items():
+				F[k] = m(x) if type(x) is str else [m(y) for y in x]
+		for k,v in self.d.items():
+			v = v.lower()
+			if len(k) > 2 and k[:2] in PERSONS:
+				F.setdefault(k[2:], [None]*7)[PERSONS[k[:2]]] = v
+			else:
+				F[k] = v
+		self.F = F
+		return F
+
+	def changed(self):
+		# call after modifying self.d
+		super().changed()
+		self.F = None # compiled overrides, see flat()
+
+	def find(self, key:str):
+		F = self.flat()
+		if len(key) > 2 and key[:2] in PERSONS:
+			x = F.get(key[2:])
+			return None if x is None else x[PERSONS[key[:2]]]
+		return F.get(key)
 
 	def fix(self, T:list, d:list) -> list:
 		return [T[i] or d[i] for i in range(0, len(T))]
 
 	def conj(self, code:str, has_vos:bool, d:list) -> list:
-		T = ["fs","fp","ss","sv" if has_vos else "ss","sp","ts","tp"]
-		return [self.find(T[i]+code) or d[i] for i in range(0, len(T))]
+		F = self.flat().get(code)
+		if F is None: return d
+		I = VOS if has_vos else NO_VOS
+		return [F[I[i]] or d[i] for i in range(0, len(I))]
 
 	##########################################################################
 	# Simple overrides by dict (i.e. self.d)
 	##########################################################################
 
+	@memo
 	def gerund(self) -> str:
 		return self.find("ge") or super().gerund()
 
+	@memo
 	def perfect(self) -> str:
 		return self.find("po") or super().perfect()
 
+	@memo
 	def present(self) -> list:
 		return self.conj("pr", True, super().present())
 	
+	@memo
 	def imperfekt(self) -> list:
 		return self.conj("ii", False, super().imperfekt())
 
+	@memo
 	def indefinido(self) -> list:
 		return self.conj("pt", False, super().indefinido())
 
+	@memo
 	def subjunktiv(self) -> list:
 		return self.conj("pb", False, super().subjunktiv())
 
@@ -85,6 +117,7 @@ class DVerb(Verb):
 	# Imperative
 	##########################################################################
 
+	@memo
 	def imperativ(self) -> list:
 		# take all from dict
 		I = self.conj("io", True, [None]*7)
@@ -103,18 +136,21 @@ class DVerb(Verb):
 	# Root-based overrides
 	##########################################################################
 
+	@memo
 	def futur(self) -> list:
 		rf = self.find("rf")
 		if rf is None: return super().futur()
 		E = ("é", "emos", "ás", "éis", "á", "án")
 		return Verb.pad(list(rf + e for e in E))
 
+	@memo
 	def konditional(self) -> list:
 		rf = self.find("rf")
 		if rf is None: rf = self.stem + self.type
 		T = self.mod_standard(rf, "ía")
 		return self.fix(T, super().konditional())
 
+	@memo
 	def subjunktiv_I(self, alt:bool=False) -> list:
 		# root is indefinido for ellos without "ron"
 		s = self.indefinido()[-1]
@@ -126,6 +162,7 @@ class DVerb(Verb):
 		T = self.mod_standard(s[:-1], s[-1]+ra, acc+ra)
 		return self.fix(T, super().subjunktiv_I(alt))
 
+	@memo
 	def subjunktiv_F(self) -> list:
 		# same as sub_I, but with "re" instead of "ra"
 		s = self.indefinido()[-1]
@@ -135,3 +172,35 @@ class DVerb(Verb):
 		T = self.mod_standard(s[:-1], s[-1]+"re", acc+"re")
 		return self.fix(T, super().subjunktiv_F())
 
+# verb prefixes: "contener" is "con" + "tener", "contestar" is not "cont" +
+# "estar" and "nadar" not "na" + "dar"
+PREFIXES = {"ab", "ad", "ante", "anti", "com", "con", "contra", "de", "des", "dis",
+	"en", "entre", "ex", "im", "in", "inter", "ob", "per", "pos", "pre", "pro",
+	"re", "sobre", "su", "sub", "super", "sus", "tras", "trans"}
+
+def prefixes(s:str) -> bool:
+	# is s a sequence of PREFIXES?
+	return s == "" or any(s.startswith(x) and prefixes(s[len(x):]) for x in PREFIXES)
+
+IX = None # (len(verbs), SuffixTrie of the parents)
+
+def parents() -> SuffixTrie:
+	# the irregulars that already have a prefixed form among the irregulars
+	# ("tener" for "obtener") by suffix, rebuilt when verbs changes. Ending
+	# in some irregular is no sign of being derived from it: presentar is
+	# not like sentar, compensar not like pensar, sudar not like dar.
+	global IX
+	if IX is None or IX[0] != len(verbs):
+		P = set()
+		for s,v in verbs.items():
+			p = v.parent and v.parent[0] if isinstance(v, DVerb) else None
+			if p and p != s and s.endswith(p) and prefixes(s[:-len(p)]): P.add(p)
+		IX = (len(verbs), SuffixTrie(P))
+	return IX[1]
+
+def family(s:str):
+	# s as a DVerb of the longest of parents() it is a prefixed form of
+	# ("contener" like "tener") or None
+	for p in parents().ends(s):
+		if p != s and prefixes(s[:-len(p)]): return DVerb(s, None, p, "")
+	return None
@@ -1,4 +1,8 @@
 #!/usr/bin/python
+import sys
+
+def eprint(*args, **kwargs):
+	print(*args, file=sys.stderr, **kwargs)
 
 def accented(s:str) -> str:
 	if s == 'a': return "á"
@@ -13,10 +17,47 @@ def deaccent(s:str) -> str:
 
 verbs = {} # will hold all verbs, indexed by infinitivo
 
+def memo(f):
+	# caches a conjugation per verb (and arguments) until changed() is
+	# called, lists are copied because callers modify them
+	k = f.__qualname__
+	def g(self, *args):
+		M = self.M
+		kk = (k,) + args
+		if kk not in M: M[kk] = f(self, *args)
+		r = M[kk]
+		return list(r) if type(r) is list else r
+	return g
+
+class Paradigm:
+	# every form table() shows, computed once per verb by Verb.paradigm()
+	__slots__ = ("gerund", "perfect", "present", "indefinido", "imperfekt",
+		"futur", "konditional", "imperativ", "subjunktiv", "subjunktiv_I",
+		"subjunktiv_I2", "subjunktiv_F")
+
+	def __init__(self, *F):
+		assert(len(F) == len(Paradigm.__slots__))
+		for k,x in zip(Paradigm.__slots__, F):
+			object.__setattr__(self, k, x if x is None or type(x) is str else tuple(x))
+
+	def __setattr__(self, k, x):
+		raise AttributeError("Paradigm is immutable")
+
+	def __iter__(self):
+		return (getattr(self, k) for k in Paradigm.__slots__)
+
+	def __eq__(self, other):
+		# ignoring case like regular() always did
+		def l(x):
+			if x is None or type(x) is str: return x and x.lower()
+			return tuple(y.lower() for y in x)
+		return all(l(a) == l(b) for a,b in zip(self, other))
+
 class Verb:
 	def __init__(self, s:str, tr:str=None):
 		self.full = s
 		self.trans = tr
+		self.changed()
 		self.stem = s[:-2].lower()
 		self.type = deaccent(s[-2:].lower())
 		if not self.type in {"ar","er","ir"}:
@@ -31,6 +72,27 @@ class Verb:
 	def __str__(self):
 		return self.full
 
+	def changed(self):
+		# drops all cached conjugations
+		self.M = {}
+		self.P = None
+		self.B = None
+
+	def paradigm(self) -> Paradigm:
+		if self.P is None:
+			self.P = Paradigm(self.gerund(), self.perfect(),
+				self.present(), self.indefinido(), self.imperfekt(),
+				self.futur(), self.konditional(), self.imperativ(),
+				self.subjunktiv(), self.subjunktiv_I(),
+				self.subjunktiv_I(True), self.subjunktiv_F())
+		return self.P
+
+	def base(self) -> Paradigm:
+		# the fully regular paradigm, what table() highlights against
+		if self.B is None:
+			self.B = self.paradigm() if type(self) == Verb else Verb(self.full).paradigm()
+		return self.B
+
 	##########################################################################
 	# Helper stuff
 	##########################################################################
@@ -62,12 +124,15 @@ class Verb:
 	# Conjugations
 	##########################################################################
 	
+	@memo
 	def gerund(self) -> str:
 		return self.stem + ("ando" if self.ar else "iendo")
 
+	@memo
 	def perfect(self) -> str:
 		return self.stem + ("ado" if self.ar else "ido")
 
+	@memo
 	def present(self) -> list:
 		b = self.type[0]
 		bb = accented(b)
@@ -80,6 +145,7 @@ class Verb:
 		#elif self.ir: E = ("o", "imos", "es", "ís",  "ís", "e", "en")
 		#return list(self.stem + e for e in E)
 
+	@memo
 	def imperativ(self) -> list:
 		b = self.type[0] # for vosotros and tú (except -ir)
 		bb = accented(b) # vos gets an accent: ¡vos abrí!
@@ -100,6 +166,7 @@ class Verb:
 	# Futures
 	##########################################################################
 	
+	@memo
 	def futur(self) -> list:
 		E = ("é", "emos", "ás", "éis", "á", "án")
 		return Verb.pad(list(self.stem + self.type + e for e in E))
@@ -108,11 +175,13 @@ class Verb:
 	# Pasts
 	##########################################################################
 	
+	@memo
 	def indefinido(self) -> list:
 		if self.ar: E = ("é", "amos", "aste", "asteis",  "ó",  "aron")
 		else:       E = ("í", "imos", "iste", "isteis", "ió", "ieron")
 		return Verb.pad(list(self.stem + e for e in E))
 
+	@memo
 	def imperfekt(self) -> list:
 		if self.ar: return self.standard("aba", "ába")
 		else:       return self.standard("ía")
@@ -121,18 +190,22 @@ class Verb:
 	# Conditionals
 	##########################################################################
 	
+	@memo
 	def konditional(self) -> list:
 		return self.standard(self.type + "ía")
 
+	@memo
 	def subjunktiv(self) -> list:
 		if self.ar: return self.standard("e", None, "é")
 		else:       return self.standard("a", None, "á")
 
+	@memo
 	def subjunktiv_I(self, alt:bool=False) -> list:
 		ra = "ra" if not alt else "se"
 		if self.ar: return self.standard( "a"+ra,  "á"+ra)
 		else:       return self.standard("ie"+ra, "ié"+ra)
 
+	@memo
 	def subjunktiv_F(self) -> list:
 		if self.ar: return self.standard( "are",  "áre")
 		else:       return self.standard("iere", "iére")
@@ -143,49 +216,26 @@ class Verb:
 	
 	def regular(self) -> bool:
 		if type(self) == Verb: return True
-		v = Verb(self.full)
-		if v.gerund().lower() != self.gerund().lower(): return False
-		if v.perfect().lower() != self.perfect().lower(): return False
-		def c(A,B) -> bool:
-			if len(A) != len(B): return False
-			for i in range(0, len(A)):
-				if A[i].lower() != B[i].lower(): return False
-			return True
-		if not c(v.present(), self.present()): return False
-		if not c(v.indefinido(), self.indefinido()): return False
-		if not c(v.imperfekt(), self.imperfekt()): return False
-		if not c(v.futur(), self.futur()): return False
-		if not c(v.imperativ(), self.imperativ()): return False
-		if not c(v.konditional(), self.konditional()): return False
-		if not c(v.subjunktiv(), self.subjunktiv()): return False
-		if not c(v.subjunktiv_I(), self.subjunktiv_I()): return False
-		if not c(v.subjunktiv_I(True), self.subjunktiv_I(True)): return False
-		if not c(v.subjunktiv_F(), self.subjunktiv_F()): return False
-		return True
+		return self.base() == self.paradigm()
 
 	def irregularities(self) -> dict:
 		if type(self) == Verb: return {}
 		d = {}
-		v = Verb(self.full)
+		K = {"gerund":"g", "perfect":"p", "present":"prs", "indefinido":"ind",
+			"imperfekt":"imp", "futur":"ftr", "imperativ":"imv",
+			"konditional":"con", "subjunktiv":"sub", "subjunktiv_I":"si1",
+			"subjunktiv_I2":"si2", "subjunktiv_F":"sf"}
+		v,P = self.base(), self.paradigm()
 		def f(a,b,k):
 			if a.lower() != b.lower(): d[k] = b
-			
-		f(v.gerund(), self.gerund(), "g")
-		f(v.perfect(), self.perfect(), "p")
-		def c(A,B,k) -> bool:
+		for n,k in K.items():
+			A,B = getattr(v,n), getattr(P,n)
+			if type(A) is str:
+				f(A, B, k)
+				continue
 			assert(len(A) == len(B))
 			for i in range(0, len(A)):
 				f(A[i], B[i], k+str(i))
-		c(v.present(), self.present(), "prs")
-		c(v.indefinido(), self.indefinido(), "ind")
-		c(v.imperfekt(), self.imperfekt(), "imp")
-		c(v.futur(), self.futur(), "ftr")
-		c(v.imperativ(), self.imperativ(), "imv")
-		c(v.konditional(), self.konditional(), "con")
-		c(v.subjunktiv(), self.subjunktiv(), "sub")
-		c(v.subjunktiv_I(), self.subjunktiv_I(), "si1")
-		c(v.subjunktiv_I(True), self.subjunktiv_I(True), "si2")
-		c(v.subjunktiv_F(), self.subjunktiv_F(), "sf")
 		return d
 
 	##########################################################################
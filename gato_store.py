@@ -0,0 +1,191 @@
+#!/usr/bin/python
+from gato_regular import *
+from conj_store import *
+from conj_index import BKTree, StoredBKTree
+import os
+
+HERE = os.path.dirname(os.path.realpath(__file__))
+store = Store("gato", [os.path.join(HERE, f) for f in
+	("gato_regular.py", "gato_irregular.py", "gato_verbs.py", "gato_store.py")])
+
+class SVerb(Verb):
+	# verb read back from the store, parent is just the infinitive here
+	def __init__(self, s:str, tr:str, parent:str, F:list):
+		super().__init__(s, tr)
+		self.parent = parent
+		self.P = Paradigm(*F)
+
+	def changed(self):
+		self.M = {}
+		self.B = None
+
+	def gerund(self) -> str:  return self.P.gerund
+	def perfect(self) -> str: return self.P.perfect
+	def present(self) -> list:     return list(self.P.present)
+	def indefinido(self) -> list:  return list(self.P.indefinido)
+	def imperfekt(self) -> list:   return list(self.P.imperfekt)
+	def futur(self) -> list:       return list(self.P.futur)
+	def konditional(self) -> list: return list(self.P.konditional)
+	def imperativ(self) -> list:   return list(self.P.imperativ)
+	def subjunktiv(self) -> list:  return list(self.P.subjunktiv)
+	def subjunktiv_I(self, alt:bool=False) -> list:
+		return list(self.P.subjunktiv_I2 if alt else self.P.subjunktiv_I)
+	def subjunktiv_F(self) -> list: return list(self.P.subjunktiv_F)
+
+# table() labels of the Paradigm fields
+TENSES = ["Gerund", "Perfect", "Present", "Past1", "Past2", "Future", "Cond",
+	"Imp", "Sub.P", "Sub.I", "Sub.I2", "Sub.F"]
+
+def load():
+	# build the full registry from the python tables
+	from gato_irregular import DVerb
+	from gato_verbs import regulars, irregulars
+	if len(verbs) > 0: return
+	for v,t in regulars.items():
+		verbs[v] = Verb(v,t)
+	for v,x in irregulars.items():
+		t,P,D = x
+		verbs[v] = DVerb(v, t, P, D)
+
+def build():
+	load()
+	R = {}
+	for s,v in verbs.items():
+		P = getattr(v, "parent", None)
+		R[s] = pack_verb(v.trans, None if P is None else P[0], 0, v.paradigm())
+	N = names(verbs)
+	store.build({"verbs": R, "forms": index(verbs.items()), "names": N,
+		"bk": BKTree(N).table()}, {"forms"})
+
+def key(s:str) -> str:
+	# normalized form for reverse lookups
+	return deaccent(" ".join(s.lower().split()))
+
+def index(V) -> dict:
+	# maps normalized forms to "verb\ttense\tperson" lines, tense and
+	# person are indices into Paradigm and Verb.order(), person is empty
+	# for gerund and participle
+	I = {}
+	for s,v in V:
+		for t,F in enumerate(v.paradigm()):
+			if F is None: continue
+			for p,x in ([("", F)] if type(F) is str else enumerate(F)):
+				for y in x.split("|"):
+					l = f"{s}\t{t}\t{p}"
+					k = key(y)
+					if k not in I: I[k] = l
+					elif l not in I[k].split("\n"): I[k] += "\n" + l
+	return I
+
+def names(V) -> dict:
+	# maps normalized infinitives to the infinitives (one per line)
+	N = {}
+	for s in V: N.setdefault(key(s), []).append(s)
+	return {k: "\n".join(sorted(x)) for k,x in N.items()}
+
+daemon = None # conj_daemon.Client of a running "gato -d", see connect()
+
+def connect():
+	# lets lookup() and reverse() ask a running daemon first
+	global daemon
+	import conj_daemon
+	daemon = conj_daemon.client("gato")
+	# one started before the sources changed still has the old paradigms
+	if daemon is not None and daemon.query("stamp", "") != store.stamp(): daemon = None
+
+def open_store() -> bool:
+	# maps the store, rebuilding it first if it is stale
+	if store.open(): return True
+	build()
+	return store.open()
+
+def lookup(s:str):
+	# returns the verb for infinitive s or None, rebuilds a stale store
+	if daemon is not None and (r := daemon.query("conj", s)) is not None:
+		import conj_batch
+		return SVerb(r["verb"], r["translation"], r["parent"], conj_batch.from_dict(r, Paradigm.__slots__, Verb.order()))
+	if len(verbs) == 0: open_store()
+	if len(verbs) > 0: return verbs.get(s)
+	r = store.get(s)
+	if r is None: return None
+	tr,P,f,F = unpack_verb(r, 2)
+	return SVerb(s, tr, P, F)
+
+def reverse(s:str) -> list:
+	# returns (infinitive, tense, person) for every form matching s
+	if daemon is not None and (R := daemon.query("forms", s)) is not None:
+		T,O = Paradigm.__slots__, Verb.order()
+		return [(r["verb"], T.index(r["tense"]), None if r["person"] is None else O.index(r["person"])) for r in R]
+	k = key(s)
+	r = store.get(k, "forms") if open_store() else index(verbs.items()).get(k)
+	if r is None: return []
+	R = []
+	for l in r.split("\n"):
+		v,t,p = l.split("\t")
+		R.append((v, int(t), None if p == "" else int(p)))
+	return R
+
+def complete(prefix:str) -> list:
+	# infinitives starting with prefix, accents are optional
+	k = key(prefix)
+	if open_store(): R = store.tables["names"].prefixed(k)
+	else: R = sorted((x,v) for x,v in names(verbs).items() if x.startswith(k))
+	return [s for x,v in R for s in v.split("\n")]
+
+def suggest(s:str) -> list:
+	# known infinitives within a typo or two of s, closest first
+	k = key(s)
+	n = max(1, min(2, len(k)//4))
+	if open_store():
+		T = StoredBKTree(lambda x: store.get(x, "bk"))
+		N = lambda x: store.get(x, "names")
+	else:
+		N = names(verbs)
+		T = BKTree(N)
+		N = N.get
+	return [v for d,x in T.search(k, n) for v in N(x).split("\n") if v != s]
+
+def resolve(s:str):
+	# lookup() that takes "foo!" as regular like on the command line and
+	# "foo~" as conjugated like the irregular it is a prefixed form of
+	# ("contener~" like "tener"), or else regular
+	s = s.lower()
+	v = lookup(s)
+	if v is None and s[-1:] == '!':
+		try:
+			v = Verb(s[:-1])
+		except Exception:
+			pass
+	elif v is None and s[-1:] == '~':
+		from gato_irregular import family
+		load()
+		try:
+			v = family(s[:-1]) or Verb(s[:-1])
+		except Exception:
+			pass
+	return v
+
+def row(v:Verb):
+	# (infinitive, translation, parent, forms) for conj_batch, forms are in
+	# Paradigm order
+	P = getattr(v, "parent", None)
+	if type(P) is tuple: P = P[0]
+	return (v.full, v.trans, P, tuple(v.paradigm()))
+
+def record(s:str):
+	# row() for batch output, forms are None if s is unknown
+	v = resolve(s)
+	return (s.lower(), None, None, None) if v is None else row(v)
+
+def ops() -> dict:
+	# the queries "gato -d" answers, see conj_daemon
+	import conj_batch
+	S = store.stamp() # of the sources load() reads
+	load()
+	T,O = Paradigm.__slots__, Verb.order()
+	def conj(s):
+		r = record(s)
+		return None if r[3] is None else conj_batch.to_dict(r, T, O)
+	def forms(s):
+		return [{"verb": v, "tense": T[t], "person": None if p is None else O[p]} for v,t,p in reverse(s)]
+	return {"conj": conj, "forms": forms, "list": complete, "suggest": suggest, "stamp": lambda s: S}
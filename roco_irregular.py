@@ -1,6 +1,23 @@
 #!/usr/bin/python
 from roco_regular import *
-import re, os
+from conj_index import SuffixTrie
+import os
+
+# person prefixes of the override keys, in the order of Verb.order()
+PERSONS = {"fs":0, "fp":1, "ss":2, "sp":3, "ts":4, "tp":5}
+
+def parse(D:str) -> dict:
+	# "fsprs:dau tscon:să dea" -> {"fsprs":"dau", "tscon":"să dea"},
+	# values can have spaces, keys are the words with a colon
+	d = {}
+	k = None
+	for x in D.split():
+		if ":" in x:
+			k,v = x.split(":", 1)
+			d[k] = v
+		else:
+			d[k] += " " + x
+	return d
 
 class DVerb(Verb):
 	def __init__(self, v:str, tr:str, ext_present:bool, imp_tu:bool, p:str, D):
@@ -12,94 +29,117 @@ class DVerb(Verb):
 			self.parent = (p, p[:len(p)-n], v[:len(v)-n])
 		else:
 			self.parent = None
-
-		if type(D) is str:
-			self.d = {}
-			while True:
-				#m = re.search(r'^([a-z]+):([^ ]+) ?(.*)$', D)
-				# allow for spaces in the values:
-				m = re.search(r'^([a-z]+):((?:[^: ]+\s+)*(?:[^: ]+))(?:\s+|$)(.*)$', D)
-				if m is None:
-					assert(re.match(r'^\s*$', D))
-					break
-				self.d[m.group(1)] = m.group(2)
-				D = m.group(3)
-		else:
-			self.d = D
+		self.d = parse(D) if type(D) is str else D
 
 	##########################################################################
 	# Helper stuff
 	##########################################################################
 
-	def find(self, key:str):
+	def flat(self) -> dict:
+		# compiles self.d with everything inherited from the parent chain
+		# into {code: [form or None for each person]}, plus the plain keys
+		# (ge, pp) as {key: form}
+		if self.F is not None: return self.F
 		global verbs
-		x = self
-		mod = []
-		val = None
-		while True:
-			if key in x.d:
-				val = x.d[key]
-				break
-			if x.parent is None: return None
-			f,r,a = x.parent
+		F = {}
+		if self.parent is not None:
+			f,r,a = self.parent
 			assert(f in verbs)
-			x = verbs[f]
-			mod.append((r,a))
-		for r,a in reversed(mod):
-			assert(val.startswith(r))
-			val = a + val[len(r):]
-		return val.lower()
+			def m(val):
+				# only the last word is the verb: "să dau", "am dat"
+				if val is None: return None
+				i = val.rfind(" ") + 1
+				if not val.startswith(r, i): raise ValueError(f"{f} does not fit {self.full}: {val}")
+				return val[:i] + a + val[i+len(r):]
+			for k,x in verbs[f].flat().items():
+				F[k] = m(x) if type(x) is str else [m(y) for y in x]
+		for k,v in self.d.items():
+			v = v.lower()
+			if len(k) > 2 and k[:2] in PERSONS:
+				F.setdefault(k[2:], [None]*6)[PERSONS[k[:2]]] = v
+			else:
+				F[k] = v
+		self.F = F
+		return F
+
+
+	def changed(self):
+		# call after modifying self.d
+		super().changed()
+		self.F = None # compiled overrides, see flat()
+
+	def find(self, key:str):
+		F = self.flat()
+		if len(key) > 2 and key[:2] in PERSONS:
+			x = F.get(key[2:])
+			return None if x is None else x[PERSONS[key[:2]]]
+		return F.get(key)
 
 	def fix(self, T:list, d:list) -> list:
 		return [T[i] or d[i] for i in range(0, len(T))]
 
 	def conj(self, code:str, d:list) -> list:
-		T = ["fs","fp","ss","sp","ts","tp"]
-		return [self.find(T[i]+code) or d[i] for i in range(0, len(T))]
+		F = self.flat().get(code)
+		if F is None: return d
+		return [F[i] or d[i] for i in range(0, len(F))]
 
 	##########################################################################
 	# Simple overrides by dict (i.e. self.d)
 	##########################################################################
 
+	@memo
 	def gerund(self) -> str:
 		return self.find("ge") or super().gerund()
 
+	@memo
 	def participle_perfect(self) -> str:
 		return self.find("pp") or super().participle_perfect()
 
+	@memo
 	def present(self) -> list:
 		return self.conj("prs", super().present())
 
+	@memo
 	def conjunctive(self) -> list:
 		return self.conj("con", super().conjunctive())
 
+	@memo
 	def compound_perfect(self) -> list:
 		return self.conj("cpf", super().compound_perfect())
 
+	@memo
 	def imperfect(self) -> list:
 		return self.conj("ipf", super().imperfect())
 
+	@memo
 	def perfect(self) -> list:
 		return self.conj("pf", super().perfect())
 
+	@memo
 	def future1(self) -> list:
 		return self.conj("f1", super().future1())
 
+	@memo
 	def future2(self) -> list:
 		return self.conj("f2", super().future2())
 
+	@memo
 	def future3(self) -> list:
 		return self.conj("f3", super().future3())
 
+	@memo
 	def optative(self) -> list:
 		return self.conj("op", super().optative())
 
+	@memo
 	def optative_perfect(self) -> list:
 		return self.conj("opp", super().optative_perfect())
 
+	@memo
 	def imperative(self) -> list:
 		return self.conj("imp", super().imperative())
 
+	@memo
 	def neg_imperative(self) -> list:
 		return self.conj("nimp", super().neg_imperative())
 
@@ -117,81 +157,152 @@ class DVerb(Verb):
 			return f"'{self.full}': ({repr(tr)}, {self.extend}, {self.imp_tu}, {repr(P)}, {repr(D)})"
 
 
-	def optimize(self, reparent:bool=True) -> bool:
-		eprint(f"optimizing {self.full}")
+	def optimize(self, reparent:bool=True) -> list:
+		# drops the overrides that do not change the paradigm. With reparent,
+		# the irregulars sharing a suffix are tried as parent too. Returns the
+		# verbs with the fewest overrides.
+		if reparent: eprint(f"optimizing {self.full}")
 		n0 = len(self.d)
 		DD = {}
 		if (v := self.d.pop("ge", None)) is not None:
+			self.changed()
 			if self.gerund() != v: self.d["ge"] = v
+			self.changed()
 		if (v := self.d.pop("pp", None)) is not None:
+			self.changed()
 			if self.participle_perfect() != v: self.d["pp"] = v
+			self.changed()
 
 		T = ["fs","fp","ss","sp","ts","tp"]
 		M = [
-			("prs",  DVerb.present),
-			("con",  DVerb.conjunctive),
-			("cpf",  DVerb.compound_perfect),
-			("ipf",  DVerb.imperfect),
-			("pf",   DVerb.perfect),
-			("f1",   DVerb.future1),
-			("f2",   DVerb.future2),
-			("f3",   DVerb.future3),
-			("op",   DVerb.optative),
-			("opp",  DVerb.optative_perfect),
-			("imp",  DVerb.imperative),
-			("nimp", DVerb.neg_imperative)]
-
-		DD["ge"] = self.gerund()
-		DD["pp"] = self.participle_perfect()
+			("prs",  "present"),
+			("con",  "conjunctive"),
+			("cpf",  "compound_perfect"),
+			("ipf",  "imperfect"),
+			("pf",   "perfect"),
+			("f1",   "future1"),
+			("f2",   "future2"),
+			("f3",   "future3"),
+			("op",   "optative"),
+			("opp",  "optative_perfect"),
+			("imp",  "imperative"),
+			("nimp", "neg_imperative")]
+
+		# removing redundant items does not change the paradigm
+		P = self.paradigm()
+		DD["ge"] = P.gerund
+		DD["pp"] = P.participle_perfect
 
 		for code,f in M:
-			P = f(self)
 			for i,t in enumerate(T):
-				DD[t+code] = P[i]
+				DD[t+code] = getattr(P, f)[i]
 				if (v := self.d.pop(t+code, None)) is None: continue
-				if f(self)[i] != v: self.d[t+code] = v
+				self.changed()
+				if getattr(self, f)()[i] != v: self.d[t+code] = v
+				self.changed()
 
 		n = len(self.d)
-		if n != n0:
+		if n != n0 and reparent:
 			eprint(f"removed {n0-n} items")
 
-		if not reparent: return n < n0
+		if not reparent: return [self]
 
 		min = n
-
-		global verbs
-		V = []
-		for s,v in verbs.items():
+		V = [self]
+		for s,m in suffixes().common(self.full, len(self.type)+1):
 			if s == self.full: continue
-			if type(v) == Verb: continue
 			if self.parent is not None and self.parent[0] == s: continue
-			if v.extend != self.extend: continue
-			s0 = self.full
-			# find common suffix
-			m = 0
-			while m < len(s) and m < len(s0) and s[-1-m] == s0[-1-m]:
-				m += 1
-			if m <= len(self.type): continue
-
-			vv = DVerb(s0, self.trans, self.extend, self.imp_tu, s, DD)
-			vv.optimize(False)
+			if verbs[s].extend != self.extend: continue
+
+			vv = DVerb(self.full, self.trans, self.extend, self.imp_tu, s, dict(DD))
+			try:
+				vv.optimize(False)
+			except ValueError:
+				continue # parent forms do not share the stem
 			nn = len(vv.d)
-			if nn < min: min = nn
-			if nn < n and nn == min:
+			if nn < min:
+				min = nn
+				V = []
+			if nn == min and nn < n:
 				V.append(vv)
 
-		p = os.path.expanduser("~/bin/roco_verbs_new.py")
-		with open(p, "a") as F:
-			if n == min:
-				print(self.recipe())
-				F.write(self.recipe()+",\n")
-			else:
-				for v in V:
-					if len(v.d) > min: continue
-					print(v.recipe())
-					F.write(self.recipe()+",\n")
-
-		return min < n0
-
-
-
+		return V
+
+IX = None # (len(verbs), SuffixTrie of the irregulars)
+
+def suffixes() -> SuffixTrie:
+	# the irregular infinitives by suffix, rebuilt when verbs changes
+	global IX
+	if IX is None or IX[0] != len(verbs):
+		IX = (len(verbs), SuffixTrie(s for s,v in verbs.items() if isinstance(v, DVerb)))
+	return IX[1]
+
+def save(R, path:str="~/bin/roco_verbs_new.py"):
+	# merges the recipe lines R into the file at path, one line per verb
+	path = os.path.expanduser(path)
+	D = {}
+	if os.path.isfile(path):
+		with open(path) as F:
+			for l in F:
+				if l.startswith("'"): D[l[1:l.index("'", 1)]] = l.rstrip()
+	for r in R: D[r[1:r.index("'", 1)]] = r + ","
+	os.makedirs(os.path.dirname(path), 0o755, True)
+	with open(path + ".tmp", "w") as F:
+		for k in sorted(D): F.write(D[k] + "\n")
+	os.replace(path + ".tmp", path)
+
+def minimize(s:str):
+	# worker for optimize_all: overrides of verbs[s] without its redundant ones
+	v = verbs[s]
+	v = DVerb(s, v.trans, v.extend, v.imp_tu, v.parent and v.parent[0], dict(v.d))
+	v.optimize(False)
+	return v.parent and v.parent[0], v.d
+
+def reparent(s:str):
+	# worker for optimize_all: best (parent, overrides) for verbs[s] or None
+	v = verbs[s]
+	v = DVerb(s, v.trans, v.extend, v.imp_tu, v.parent and v.parent[0], dict(v.d))
+	v = min(v.optimize(), key=lambda x: len(x.parent[0]) if x.parent else 0)
+	return None if len(v.d) >= len(verbs[s].d) else (v.parent and v.parent[0], v.d)
+
+def optimize_all(jobs:int=None) -> list:
+	# minimizes all irregulars in verbs and returns their recipes. Every verb
+	# is done on its own, so the results are checked together afterwards:
+	# parent cycles are not taken and verbs whose paradigm changed (because
+	# a parent lost overrides they inherited) fall back to their old recipe.
+	import multiprocessing
+	S = [s for s,v in verbs.items() if isinstance(v, DVerb)]
+	O = {s: (verbs[s].parent and verbs[s].parent[0], verbs[s].d) for s in S}
+	P0 = {s: verbs[s].paradigm() for s in S}
+	def run(f):
+		if jobs == 1: return dict(zip(S, map(f, S)))
+		# the workers read verbs as it is now, which only fork passes on
+		with multiprocessing.get_context("fork").Pool(jobs) as X: return dict(zip(S, X.map(f, S)))
+	def setup(R):
+		for s,(p,d) in R.items():
+			v = verbs[s]
+			verbs[s] = DVerb(s, v.trans, v.extend, v.imp_tu, p, d)
+
+	A = run(minimize)
+	setup(A)
+	B = run(reparent)
+	R = dict(A)
+	# biggest savings first, and rather "da" as parent of "reda" than the
+	# other way round
+	for s in sorted((s for s in S if B[s]), key=lambda s: (len(B[s][1]) - len(A[s][1]), len(B[s][0] or s) - len(s))):
+		p = B[s][0]
+		while p is not None and p != s: p = R[p][0] if p in R else None
+		if p is None: R[s] = B[s]
+
+	while True:
+		setup(R)
+		bad = [s for s in S if verbs[s].paradigm() != P0[s]]
+		if len(bad) == 0: break
+		for s in bad:
+			if R[s] is not A[s] and R[s] is not O[s]:
+				R[s] = A[s]
+				continue
+			while s in R and R[s] is not O[s]:
+				R[s] = O[s]
+				s = O[s][0]
+	return [verbs[s].recipe() for s in S]
@@ -9,6 +9,42 @@ def eprint(*args, **kwargs):
 
 verbs = {} # will hold all verbs, indexed by infinitive
 
+def memo(f):
+	# caches a conjugation per verb until changed() is called, lists are
+	# copied because callers modify them
+	k = f.__qualname__
+	def g(self):
+		M = self.M
+		if k not in M: M[k] = f(self)
+		r = M[k]
+		return list(r) if type(r) is list else r
+	return g
+
+class Paradigm:
+	# every form table() shows, computed once per verb by Verb.paradigm()
+	__slots__ = ("gerund", "participle_perfect", "present", "conjunctive",
+		"optative", "optative_perfect", "future1", "future2", "future3",
+		"compound_perfect", "imperfect", "perfect", "imperative",
+		"neg_imperative")
+
+	def __init__(self, *F):
+		assert(len(F) == len(Paradigm.__slots__))
+		for k,x in zip(Paradigm.__slots__, F):
+			object.__setattr__(self, k, x if x is None or type(x) is str else tuple(x))
+
+	def __setattr__(self, k, x):
+		raise AttributeError("Paradigm is immutable")
+
+	def __iter__(self):
+		return (getattr(self, k) for k in Paradigm.__slots__)
+
+	def __eq__(self, other):
+		# ignoring case like regular() always did
+		def l(x):
+			if x is None or type(x) is str: return x and x.lower()
+			return tuple(y.lower() for y in x)
+		return all(l(a) == l(b) for a,b in zip(self, other))
+
 class Verb:
 	def __init__(self, s:str, tr:str=None, ext_present:bool=False, imp_tu:bool=False):
 		if s[:2].lower() == "a ": s = s[2:] # "a vorbi" -> "vorbi"
@@ -26,6 +62,7 @@ class Verb:
 		if self.extend and self.type in {"e","ea"}:
 			raise Exception("Cannot extend -e or -ea verbs!")
 		self.imp_tu = imp_tu
+		self.changed()
 
 	def __eq__(self, other):
 		return other is not None and self.full == other.full
@@ -33,6 +70,31 @@ class Verb:
 	def __str__(self):
 		return self.full
 
+	def changed(self):
+		# drops all cached conjugations, call after changing extend/imp_tu
+		self.M = {}
+		self.P = None
+		self.B = None
+
+	def paradigm(self) -> Paradigm:
+		if self.P is None:
+			self.P = Paradigm(self.gerund(), self.participle_perfect(),
+				self.present(), self.conjunctive(), self.optative(),
+				self.optative_perfect(), self.future1(), self.future2(),
+				self.future3(), self.compound_perfect(), self.imperfect(),
+				self.perfect(), self.imperative(), self.neg_imperative())
+		return self.P
+
+	def base(self) -> Paradigm:
+		# the regular paradigm with the same present form, what table()
+		# highlights against (always without the tu imperative)
+		if self.B is None:
+			if type(self) == Verb and not self.imp_tu:
+				self.B = self.paradigm()
+			else:
+				self.B = Verb(self.full, None, self.extend).paradigm()
+		return self.B
+
 	##########################################################################
 	# Conjugations
 	##########################################################################
@@ -44,6 +106,7 @@ class Verb:
 		assert len(E) == len(O)
 		return list(O[i] + " " + E[i] for i in range(0,len(E)))
 
+	@memo
 	def present(self) -> list:
 		b = self.type[0] # ea -> e
 		if b == "î": b = "â" # îm -> âm
@@ -61,6 +124,7 @@ class Verb:
 		assert(len(E) == 6)
 		return list(self.stem + e for e in E)
 
+	@memo
 	def conjunctive(self) -> list:
 		E = self.present()
 		e = E[4]
@@ -72,17 +136,20 @@ class Verb:
 			e = e[:-1] + "ă"
 		elif e[-1] == "ă":
 			e = e[:-1] + "e"
-		E[4:5] = e,e
+		E[4:6] = e,e
 		return list("să " + e for e in E)
 
+	@memo
 	def participle_perfect(self) -> str:
 		return self.stem + self.type + "t" # todo...
 
+	@memo
 	def compound_perfect(self) -> list:
 		hv = ["am", "am", "ai", "ați", "a", "au"]
 		pp = self.participle_perfect()
 		return list(h + " " + pp for h in hv)
 
+	@memo
 	def imperfect(self) -> list:
 		E = ["m", "m", "i", "ți", "", "u"]
 		if self.type == "i" and self.stem[-1] in {"a","e","i","o","u","ă","î","â"}:
@@ -93,6 +160,7 @@ class Verb:
 			m = "ea"
 		return list(self.stem + m + e for e in E)
 
+	@memo
 	def perfect(self) -> list:
 		pp = self.participle_perfect()
 		if pp[-1] == "t": pp = pp[:-1]
@@ -102,31 +170,38 @@ class Verb:
 			E[4] = "e" if self.stem[-1] == "i" else "ă"
 		return list(pp + e for e in E)
 
+	@memo
 	def future1(self) -> list:
 		hv = ["voi", "vom", "vei", "veți", "va", "vor"]
 		return list(h + " " + self.full for h in hv)
 
+	@memo
 	def future2(self) -> list:
 		hv = ["am", "am", "ai", "aveți", "are", "au"]
 		c = self.conjunctive()
 		return list(hv[i] + " " + c[i] for i in range(0,len(hv)))
 
+	@memo
 	def future3(self) -> list:
 		C = self.conjunctive()
 		return list("o " + c for c in C)
 
+	@memo
 	def optative(self) -> list:
 		hv = ["aș", "am", "ai", "ați", "ar", "ar"]
 		return list(h + " " + self.full for h in hv)
 
+	@memo
 	def optative_perfect(self) -> list:
 		hv = ["aș", "am", "ai", "ați", "ar", "ar"]
 		pp = self.participle_perfect()
 		return list(h + " fi " + pp for h in hv)
 
+	@memo
 	def gerund(self) -> str:
 		return self.stem + ("ind" if self.type == "i" else "ând")
 
+	@memo
 	def imperative(self) -> list:
 		C = self.conjunctive()
 		P = self.present()
@@ -134,6 +209,7 @@ class Verb:
 		C[3] = P[3] # voi = present.voi
 		return C
 
+	@memo
 	def neg_imperative(self) -> list:
 		C = self.conjunctive()
 		P = self.present()
@@ -147,52 +223,27 @@ class Verb:
 	
 	def regular(self) -> bool:
 		if type(self) == Verb: return True
-		v = Verb(self.full)
-		def c(A,B) -> bool:
-			if len(A) != len(B): return False
-			for i in range(0, len(A)):
-				if A[i].lower() != B[i].lower(): return False
-			return True
-		if v.gerund().lower() != self.gerund().lower(): return False
-		if v.participle_perfect().lower() != self.participle_perfect().lower(): return False
-		if not c(v.present(), self.present()): return False
-		if not c(v.conjunctive(), self.conjunctive()): return False
-		if not c(v.compound_perfect(), self.compound_perfect()): return False
-		if not c(v.imperfect(), self.imperfect()): return False
-		if not c(v.perfect(), self.perfect()): return False
-		if not c(v.future1(), self.future1()): return False
-		if not c(v.future2(), self.future2()): return False
-		if not c(v.future3(), self.future3()): return False
-		if not c(v.optative(), self.optative()): return False
-		if not c(v.optative_perfect(), self.optative_perfect()): return False
-		if not c(v.imperative(), self.imperative()): return False
-		if not c(v.neg_imperative(), self.neg_imperative()): return False
-		return True
+		return self.base() == self.paradigm()
 
 	def irregularities(self) -> dict:
 		if type(self) == Verb: return {}
 		d = {}
-		v = Verb(self.full)
+		K = {"gerund":"ge", "participle_perfect":"pp", "present":"prs",
+			"conjunctive":"con", "compound_perfect":"cpf", "imperfect":"ipf",
+			"perfect":"pf", "future1":"f1", "future2":"f2", "future3":"f3",
+			"optative":"op", "optative_perfect":"opp", "imperative":"imp",
+			"neg_imperative":"nimp"}
+		v,P = self.base(), self.paradigm()
 		def f(a,b,k):
 			if a.lower() != b.lower(): d[k] = b
-		def c(A,B,k) -> bool:
+		for n,k in K.items():
+			A,B = getattr(v,n), getattr(P,n)
+			if type(A) is str:
+				f(A, B, k)
+				continue
 			assert(len(A) == len(B))
 			for i in range(0, len(A)):
 				f(A[i], B[i], k+str(i))
-		f(v.gerund(), self.gerund(), "ge")
-		f(v.participle_perfect(), self.participle_perfect(), "pp")
-		c(v.present(), self.present(), "prs")
-		c(v.conjunctive(), self.conjunctive(), "con")
-		c(v.compound_perfect(), self.compound_perfect(), "cpf")
-		c(v.imperfect(), self.imperfect(), "ipf")
-		c(v.perfect(), self.perfect(), "pf")
-		c(v.future1(), self.future1(), "f1")
-		c(v.future2(), self.future2(), "f2")
-		c(v.future3(), self.future3(), "f3")
-		c(v.optative(), self.optative(), "op")
-		c(v.optative_perfect(), self.optative_perfect(), "opp")
-		c(v.imperative(), self.imperative(), "imp")
-		c(v.neg_imperative(), self.neg_imperative(), "nimp")
 		return d
 
 
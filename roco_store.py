@@ -0,0 +1,196 @@
+#!/usr/bin/python
+from roco_regular import *
+from conj_store import *
+from conj_index import BKTree, StoredBKTree
+import os
+
+HERE = os.path.dirname(os.path.realpath(__file__))
+store = Store("roco", [os.path.join(HERE, f) for f in
+	("roco_regular.py", "roco_irregular.py", "roco_verbs.py", "roco_store.py")])
+
+# flag bits
+EXTEND = 1
+IMP_TU = 2
+
+# table() labels of the Paradigm fields
+TENSES = ["Gerund", "Perfect", "Present", "Conjunctive", "Optative",
+	"Optative.P", "future1", "future2", "future3", "compound_perfect",
+	"imperfect", "perfect", "imperative", "neg_imperative"]
+
+class SVerb(Verb):
+	# verb read back from the store, parent is just the infinitive here
+	def __init__(self, s:str, tr:str, flags:int, parent:str, F:list):
+		super().__init__(s, tr, bool(flags & EXTEND), bool(flags & IMP_TU))
+		self.parent = parent
+		self.P = Paradigm(*F)
+
+	def changed(self):
+		self.M = {}
+		self.B = None
+
+	def gerund(self) -> str:             return self.P.gerund
+	def participle_perfect(self) -> str: return self.P.participle_perfect
+	def present(self) -> list:           return list(self.P.present)
+	def conjunctive(self) -> list:       return list(self.P.conjunctive)
+	def optative(self) -> list:          return list(self.P.optative)
+	def optative_perfect(self) -> list:  return list(self.P.optative_perfect)
+	def future1(self) -> list:           return list(self.P.future1)
+	def future2(self) -> list:           return list(self.P.future2)
+	def future3(self) -> list:           return list(self.P.future3)
+	def compound_perfect(self) -> list:  return list(self.P.compound_perfect)
+	def imperfect(self) -> list:         return list(self.P.imperfect)
+	def perfect(self) -> list:           return list(self.P.perfect)
+	def imperative(self) -> list:        return list(self.P.imperative)
+	def neg_imperative(self) -> list:    return list(self.P.neg_imperative)
+
+def load():
+	# build the full registry from the python tables
+	from roco_irregular import DVerb
+	from roco_verbs import regulars, irregulars
+	if len(verbs) > 0: return
+	for v,x in regulars.items():
+		tr,ext,imp = x
+		verbs[v] = Verb(v,tr,ext,imp)
+	for v,x in irregulars.items():
+		t,ext,imp_tu,P,D = x
+		verbs[v] = DVerb(v, t, ext, imp_tu, P, D)
+
+def build():
+	load()
+	R = {}
+	for s,v in verbs.items():
+		P = getattr(v, "parent", None)
+		f = (EXTEND if v.extend else 0) | (IMP_TU if v.imp_tu else 0)
+		R[s] = pack_verb(v.trans, None if P is None else P[0], f, v.paradigm())
+	N = names(verbs)
+	store.build({"verbs": R, "forms": index(verbs.items()), "names": N,
+		"bk": BKTree(N).table()}, {"forms"})
+
+def key(s:str) -> str:
+	# normalized form for reverse lookups
+	return deaccent(" ".join(s.lower().split()))
+
+def index(V) -> dict:
+	# maps normalized forms to "verb\ttense\tperson" lines, tense and
+	# person are indices into Paradigm and Verb.order(), person is empty
+	# for gerund and participle
+	I = {}
+	for s,v in V:
+		for t,F in enumerate(v.paradigm()):
+			if F is None: continue
+			for p,x in ([("", F)] if type(F) is str else enumerate(F)):
+				for y in x.split("|"):
+					l = f"{s}\t{t}\t{p}"
+					k = key(y)
+					if k not in I: I[k] = l
+					elif l not in I[k].split("\n"): I[k] += "\n" + l
+	return I
+
+def names(V) -> dict:
+	# maps normalized infinitives to the infinitives (one per line)
+	N = {}
+	for s in V: N.setdefault(key(s), []).append(s)
+	return {k: "\n".join(sorted(x)) for k,x in N.items()}
+
+daemon = None # conj_daemon.Client of a running "roco -d", see connect()
+
+def connect():
+	# lets lookup() and reverse() ask a running daemon first
+	global daemon
+	import conj_daemon
+	daemon = conj_daemon.client("roco")
+	# one started before the sources changed still has the old paradigms
+	if daemon is not None and daemon.query("stamp", "") != store.stamp(): daemon = None
+
+def open_store() -> bool:
+	# maps the store, rebuilding it first if it is stale
+	if store.open(): return True
+	build()
+	return store.open()
+
+def lookup(s:str):
+	# returns the verb for infinitive s or None, rebuilds a stale store
+	if daemon is not None and (r := daemon.query("conj", s)) is not None:
+		import conj_batch
+		f = (EXTEND if r["extend"] else 0) | (IMP_TU if r["imp_tu"] else 0)
+		return SVerb(r["verb"], r["translation"], f, r["parent"], conj_batch.from_dict(r, Paradigm.__slots__, Verb.order()))
+	if len(verbs) == 0: open_store()
+	if len(verbs) > 0: return verbs.get(s)
+	r = store.get(s)
+	if r is None: return None
+	tr,P,f,F = unpack_verb(r, 2)
+	return SVerb(s, tr, f, P, F)
+
+def reverse(s:str) -> list:
+	# returns (infinitive, tense, person) for every form matching s
+	if daemon is not None and (R := daemon.query("forms", s)) is not None:
+		T,O = Paradigm.__slots__, Verb.order()
+		return [(r["verb"], T.index(r["tense"]), None if r["person"] is None else O.index(r["person"])) for r in R]
+	k = key(s)
+	r = store.get(k, "forms") if open_store() else index(verbs.items()).get(k)
+	if r is None: return []
+	R = []
+	for l in r.split("\n"):
+		v,t,p = l.split("\t")
+		R.append((v, int(t), None if p == "" else int(p)))
+	return R
+
+def complete(prefix:str) -> list:
+	# infinitives starting with prefix, accents are optional
+	k = key(prefix)
+	if open_store(): R = store.tables["names"].prefixed(k)
+	else: R = sorted((x,v) for x,v in names(verbs).items() if x.startswith(k))
+	return [s for x,v in R for s in v.split("\n")]
+
+def suggest(s:str) -> list:
+	# known infinitives within a typo or two of s, closest first
+	k = key(s)
+	n = max(1, min(2, len(k)//4))
+	if open_store():
+		T = StoredBKTree(lambda x: store.get(x, "bk"))
+		N = lambda x: store.get(x, "names")
+	else:
+		N = names(verbs)
+		T = BKTree(N)
+		N = N.get
+	return [v for d,x in T.search(k, n) for v in N(x).split("\n") if v != s]
+
+def resolve(s:str):
+	# lookup() that takes "foo!" and "foo!!" as regular like on the command
+	# line (but never fetches)
+	s = s.lower()
+	v = lookup(s)
+	if v is None and s[-1:] == '!':
+		try:
+			v = Verb(s.rstrip('!'), None, s[-2:] == '!!')
+		except Exception:
+			pass
+	return v
+
+def row(v:Verb):
+	# (infinitive, translation, parent, forms) for conj_batch, forms are in
+	# Paradigm order
+	P = getattr(v, "parent", None)
+	if type(P) is tuple: P = P[0]
+	return (v.full, v.trans, P, tuple(v.paradigm()))
+
+def record(s:str):
+	# row() for batch output, forms are None if s is unknown
+	v = resolve(s)
+	return (s.lower(), None, None, None) if v is None else row(v)
+
+def ops() -> dict:
+	# the queries "roco -d" answers, see conj_daemon
+	import conj_batch
+	S = store.stamp() # of the sources load() reads
+	load()
+	T,O = Paradigm.__slots__, Verb.order()
+	def conj(s):
+		v = resolve(s)
+		if v is None: return None
+		D = conj_batch.to_dict(row(v), T, O)
+		D["extend"],D["imp_tu"] = v.extend, v.imp_tu
+		return D
+	def forms(s):
+		return [{"verb": v, "tense": T[t], "person": None if p is None else O[p]} for v,t,p in reverse(s)]
+	return {"conj": conj, "forms": forms, "list": complete, "suggest": suggest, "stamp": lambda s: S}
@@ -1,131 +1,382 @@
 #!/usr/bin/python
 from roco_irregular import *
-import re, os, subprocess
+import re, os, subprocess, threading, time, json, zlib
+import http.client, urllib.parse
+from concurrent.futures import Future, ThreadPoolExecutor
 
-class WVerb(DVerb):
-	def __init__(self, v:str):
-		if v[:2].lower() == "a ": v = v[2:] # "a vorbi" -> "vorbi"
-		if not re.match(r'^[a-zA-ZâÂăĂîÎșȘțȚ ]+$', v): raise Exception("Bad verb name!")
-
-		p = os.path.expanduser("~/.cache/roco/")
-		f = os.path.join(p, f"{v}.html")
-		if os.path.isfile(f):
-			# read from cache
-			with open(f) as F: s = F.read()
-		else:
-			# read from web, write to cache
-			os.makedirs(p, 0o700, True)
-			r = subprocess.run(
-				f"chromium --headless --dump-dom https://www.verbix.com/webverbix/go.php?&D1=5&T1={v}".split(),
-				capture_output=True, text=True)
+# {} is replaced by the verb, point ROCO_URL to a local server for testing
+URL   = os.environ.get("ROCO_URL", "https://www.verbix.com/webverbix/go.php?&D1=5&T1={}")
+CACHE = os.path.expanduser("~/.cache/roco/")
+
+# cache limits: size in MB (least recently used pages go first), days until
+# a page is fetched again and whether to keep the compressed raw pages
+CACHE_MB   = float(os.environ.get("ROCO_CACHE_MB", "64"))
+CACHE_DAYS = float(os.environ.get("ROCO_CACHE_DAYS", "365"))
+CACHE_HTML = os.environ.get("ROCO_CACHE_HTML", "1") != "0"
+
+# bump when parse_page() changes, cached pages with html are then reparsed
+PARSER = 1
+
+class Fetcher:
+	# keeps one HTTP connection per thread alive between requests, and
+	# concurrent requests for the same verb wait for a single fetch
+	def __init__(self):
+		self.local = threading.local()
+		self.lock = threading.Lock()
+		self.pending = {} # verb -> Future
+
+	def connection(self, scheme:str, host:str, fresh:bool=False):
+		C = self.local.__dict__.setdefault("C", {})
+		c = C.get((scheme, host))
+		if c is None or fresh:
+			if c is not None: c.close()
+			c = (http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection)(host, timeout=30)
+			C[(scheme, host)] = c
+		return c
+
+	def get(self, url:str) -> str:
+		for redirects in range(0, 5):
+			u = urllib.parse.urlsplit(url)
+			path = u.path + ("?" + u.query if u.query else "")
+			for retry in [False, True]:
+				# a kept-alive connection might have been closed by the server
+				c = self.connection(u.scheme, u.netloc, retry)
+				try:
+					c.request("GET", path or "/", headers={"User-Agent": "Mozilla/5.0 (roco)"})
+					r = c.getresponse()
+					body = r.read()
+					break
+				except (http.client.HTTPException, ConnectionError):
+					if retry: raise
+			if r.status in {301,302,303,307,308} and r.getheader("Location"):
+				url = urllib.parse.urljoin(url, r.getheader("Location"))
+				continue
+			if r.status != 200: raise Exception(f"Fetching failed: HTTP {r.status} {r.reason}")
+			return body.decode(r.headers.get_content_charset() or "utf-8", "replace")
+		raise Exception("Fetching failed: too many redirects")
+
+	def download(self, v:str) -> str:
+		url = URL.format(urllib.parse.quote(v))
+		if os.environ.get("ROCO_FETCH") == "chromium":
+			# for when the page needs javascript after all
+			r = subprocess.run(["chromium", "--headless", "--dump-dom", url], capture_output=True, text=True)
 			if r.returncode != 0: raise Exception(f"Fetching failed: {str(r)}")
-			s = r.stdout
-			with open(f, "w") as F:
-				F.write(s)
-
-		s = re.sub(r'ş', r'ș', s)
-		s = re.sub(r'ţ', r'ț', s)
-
-		s = re.sub(r'^.*<h3>Nominal Forms</h3>', r'', s, flags=re.DOTALL)
-		s = re.sub(r'<h3>Synonyms.+$', r'', s, flags=re.DOTALL)
-		s = re.sub(r'<a href=[^>]+>([^<]+)</a>', r'\1', s)
-		s = re.sub(r'\s*class="normal"', r'', s)
-		s = re.sub(r'\s*data-speech="[^"]+"', r'', s)
-
-		h3,h4,key,tr=None,None,None,None
-		d = {}
-		cases = {'eu':'fs', 'tu':'ss', 'el':'ts', 'ea':'ts', 
-			'noi':'fp', 'voi':'sp', 'ei':'tp', 'ele':'tp'}
-		keys = {
-			'Indicativ|Prezent':'prs',
-			'Indicativ|Perfect compus':'cpf',
-			'Indicativ|Imperfect':'ipf',
-			'Indicativ|Perfect simplu':'pf',
-
-			'Indicativ|Viitor I':'f1',
-			'Indicativ|Viitor I (popular)':'f3',
-			'Indicativ|Viitor I (popular)':None,
-			'Indicativ|Viitor II (popular)':None,
-			'Indicativ|Viitor II':None,
-			
-			'Conditional|Prezent':'op',
-			'Conditional|Perfect':'opp',
-			'Imperative|None':'imp',
-			'Subjonctiv|Prezent':'con',
-			'Subjonctiv|Perfect compus':None,
-			'Indicativ|Mai mult ca perfect':None,
-		}
-
-		for line in s.splitlines():
-			if r := re.search(r'<h3>([^<]+)</h3>', line):
-				h4 = None
-				h3 = r.group(1)
-			elif r := re.search(r'<h4>([^<]+)</h4>', line):
-				h4 = r.group(1)
-			elif h3 is None and h4 is None and (r := re.search(r'<b>(.+?):\s*</b>', line)):
-				key = r.group(1)
-			elif h3 is None and h4 is None and (r := re.search(r'<span[^>]*>(.+)</span>', line)):
-				if key == "Gerunziu":
-					d["ge"] = r.group(1)
+			return r.stdout
+		return self.get(url)
+
+	def fetch(self, v:str) -> str:
+		# downloads the page for v
+		with self.lock:
+			F = self.pending.get(v)
+			mine = F is None
+			if mine: F = self.pending[v] = Future()
+		if not mine: return F.result()
+		try:
+			s = self.download(v)
+			F.set_result(s)
+			return s
+		except Exception as e:
+			F.set_exception(e)
+			raise
+		finally:
+			with self.lock: del self.pending[v]
+
+fetcher = Fetcher()
+
+def check(v:str) -> str:
+	if v[:2].lower() == "a ": v = v[2:] # "a vorbi" -> "vorbi"
+	if not re.match(r'^[a-zA-ZâÂăĂîÎșȘțȚ ]+$', v): raise Exception("Bad verb name!")
+	return v
+
+def prefetch(V, jobs:int=4):
+	# warms the cache for all verbs in V, with at most jobs downloads at once
+	def f(v):
+		try:
+			v = check(v.lower())
+			if cache.fresh(v): return
+			entry(v)
+			eprint(f"fetched {v}")
+		except Exception as e:
+			eprint(f"{v} failed: {e}")
+	with ThreadPoolExecutor(jobs) as X:
+		for x in X.map(f, V): pass
+
+# cases and sections of the verbix tables, None means ignore
+CASES = {'eu':'fs', 'tu':'ss', 'el':'ts', 'ea':'ts',
+	'noi':'fp', 'voi':'sp', 'ei':'tp', 'ele':'tp'}
+KEYS = {
+	'Indicativ|Prezent':'prs',
+	'Indicativ|Perfect compus':'cpf',
+	'Indicativ|Imperfect':'ipf',
+	'Indicativ|Perfect simplu':'pf',
+
+	'Indicativ|Viitor I':'f1',
+	'Indicativ|Viitor I (popular)':None,
+	'Indicativ|Viitor II (popular)':None,
+	'Indicativ|Viitor II':None,
+
+	'Conditional|Prezent':'op',
+	'Conditional|Perfect':'opp',
+	'Imperative|None':'imp',
+	'Subjonctiv|Prezent':'con',
+	'Subjonctiv|Perfect compus':None,
+	'Indicativ|Mai mult ca perfect':None,
+}
+TOKEN = re.compile(r'<(/?)([a-zA-Z0-9]+)([^>]*)>|([^<]+)')
+
+def parse_page(s:str):
+	# single pass over the tags and texts of a verbix page, returns the
+	# override dict (like DVerb.d) and the translation
+	i = s.find("<h3>Nominal Forms</h3>")
+	i = 0 if i < 0 else i + len("<h3>Nominal Forms</h3>")
+	j = s.find("<h3>Synonyms", i)
+	s = s[i:] if j < 0 else s[i:j]
+	s = s.replace("ş", "ș").replace("ţ", "ț")
+
+	h3,h4,key,tr = None,None,None,None
+	d = {}
+	what,text = None,[] # element whose text we collect: h3, h4, b, span, pronoun
+	case,vals = None,[] # table row
+	T = None            # translation text, while inside its div
+	depth = 0           # of divs in the translation div
+
+	for m in TOKEN.finditer(s):
+		close,tag,attrs,t = m.groups()
+		if t is not None:
+			if T is not None: T.append(t)
+			elif what is not None: text.append(t)
+			elif t.strip(" \t\r\n;") not in {"", "-"} and h3 != 'Long Infinitive' and \
+				(h3 is None or 'Verbs conjugated like' not in h3):
+				eprint(f"Ignoring text on {h3}|{h4}: {t.strip()}")
+			continue
+
+		if T is not None:
+			# translations are list items, anything else is dropped
+			if tag == "div": depth += -1 if close else 1
+			if depth == 0:
+				tr = "".join(T).strip()
+				if tr[-1:] == ",": tr = tr[:-1].rstrip()
+				T = None
+			elif close and tag == "li":
+				T.append(", ")
+			continue
+
+		if not close:
+			if tag == "div" and 'id="verbixTranslations"' in attrs:
+				T,depth = [],1
+			elif tag in {"h3","h4","b"}:
+				what,text = tag,[]
+			elif tag == "span" and what is None:
+				what,text = "pronoun" if 'class="pronoun"' in attrs else "span", []
+			elif tag == "tr":
+				case,vals = None,[]
+			continue
+
+		if what is not None and (tag == what or tag == "span" and what == "pronoun"):
+			x = "".join(text)
+			w,what = what,None
+			if w == "h3":
+				h3,h4 = x,None
+			elif w == "h4":
+				h4 = x
+			elif h3 is None and h4 is None:
+				if w == "b":
+					x = x.rstrip()
+					if x[-1:] == ":": key = x[:-1]
+				elif key == "Gerunziu":
+					d["ge"] = x
+					key = None
 				elif key == "Participiu":
-					d["pp"] = r.group(1)
+					d["pp"] = x
+					key = None
 				elif key == "Infinitiv" or key == "Infinitiv compus":
-					pass
+					key = None
 				else:
-					print(f"Ignoring {key} => {r.group(1)}")
-				key = None
-			elif h3 is not None and (r := re.search(r'<span class="pronoun">([a-z]+)</span></td><td>((<span[^>]*>[^<]+</span>;?\s*)+)</td></tr>', line)):
-				c = r.group(1)
-				if not c in cases: raise Exception(f"Garbage case: {c}")
-				c = cases[c]
-
-				k = f"{h3}|{h4}"
-				if not k in keys: raise Exception(f"Garbage key: {k}")
-				k = keys[k]
-				if k is None: continue
-
-				if c+k in d:
-					print(f"Warning: overwriting {c+k}: {d[c+k]} -> {r.group(2)}")
-				
-				ss = r.group(2)
-				val = []
-				while (rr := re.search(r'<span[^>]*>([^<]+)</span>(.*)$', ss)):
-					val.append(rr.group(1))
-					ss = rr.group(2)
-				if len(val) == 0:
-					raise Exception(f"Garbage value: {r.group(2)}")
-				elif len(val) > 1:
-					print(f"Warning: Multivalue {val} for key {c+k}")
-				val = val[0]
-				d[c+k] = "să " + val if k == "con" else val
-
-			elif (r := re.search(r'<div id="verbixTranslations" sl="ron" tl="eng">(.+)</div>', line)):
-				tr = r.group(1)
-				tr = re.sub(r'</li>', ', ', tr)
-				tr = re.sub(r'<[^>]+>', r'', tr)
-				tr = re.sub(r'\s*,?\s*$', r'', tr)
-			elif re.match(r'^(\s*<[^>]+>|\s*-)*\s*$', line):
-				pass
-			elif h3 is not None and re.search(r'Verbs conjugated like', h3):
-				pass
-			elif h3 == 'Long Infinitive':
-				pass
+					eprint(f"Ignoring {key} => {x}")
+					key = None
+			elif w == "pronoun":
+				if not x in CASES: raise Exception(f"Garbage case: {x}")
+				case = CASES[x]
+			elif w == "span" and case is not None:
+				vals.append(x)
+
+		elif tag == "tr" and case is not None and h3 is not None:
+			k = f"{h3}|{h4}"
+			if not k in KEYS: raise Exception(f"Garbage key: {k}")
+			k = KEYS[k]
+			c,case = case,None
+			if k is None: continue
+			if len(vals) == 0:
+				raise Exception(f"Garbage value for {c+k}")
+			elif len(vals) > 1:
+				eprint(f"Warning: Multivalue {vals} for key {c+k}")
+			val = vals[0]
+			if c+k in d:
+				eprint(f"Warning: overwriting {c+k}: {d[c+k]} -> {val}")
+			d[c+k] = "să " + val if k == "con" else val
+
+	return d, tr
+
+def scrape(v:str, s:str):
+	# (translation, extend, imp_tu, overrides) from page s
+	d,tr = parse_page(s)
+	if tr == "(none)": tr = None
+	x = DVerb(v, tr, False, False, None, dict(d))
+	ext,imp = False,False
+	P = x.present()
+	if x.type == "a":
+		if P[0][-2:] == "ez" or P[5][-3:] == "ază":
+			ext = True
+	elif x.type == "i":
+		if P[0][-3:] == "esc" or P[5][-3:] == "esc":
+			ext = True
+	elif x.type == "î":
+		if P[0][-3:] == "ăsc" or P[5][-3:] == "ăsc":
+			ext = True
+	C = x.conjunctive()
+	if C[2] != P[4] and C[2] == P[2]: imp = True
+	return tr, ext, imp, d
+
+class Cache:
+	# parsed pages in one sqlite file, optionally with the zlib'ed page
+	def __init__(self, path:str):
+		self.path = path
+		self.db = None
+		self.lock = threading.RLock() # prefetch shares the connection
+
+	def connect(self):
+		if self.db is not None: return self.db
+		import sqlite3
+		with self.lock:
+			if self.db is not None: return self.db
+			os.makedirs(os.path.dirname(self.path), 0o700, True)
+			db = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+			db.execute("PRAGMA auto_vacuum=INCREMENTAL")
+			db.execute("""CREATE TABLE IF NOT EXISTS pages (
+				verb STRING NOT NULL PRIMARY KEY,
+				trans STRING,
+				extend INTEGER NOT NULL,
+				imp_tu INTEGER NOT NULL,
+				d STRING NOT NULL,
+				html BLOB,
+				parser INTEGER NOT NULL,
+				fetched INTEGER NOT NULL,
+				used INTEGER NOT NULL,
+				size INTEGER NOT NULL)""")
+			db.execute("CREATE INDEX IF NOT EXISTS used_index ON pages (used ASC)")
+			db.commit()
+			self.db = db
+			self.migrate()
+		return db
+
+	def migrate(self):
+		# moves the <verb>.html files of the old cache in here
+		import glob
+		F = glob.glob(os.path.join(os.path.dirname(self.path), "*.html"))
+		if len(F) == 0: return
+		eprint(f"importing {len(F)} cached pages")
+		for f in F:
+			v = os.path.basename(f)[:-5]
+			try:
+				with open(f, encoding="utf-8") as G: s = G.read()
+				self.put(v, scrape(v, s), s, int(os.path.getmtime(f)))
+			except Exception as e:
+				eprint(f"{v} failed: {e}")
+			os.remove(f)
+
+	def get(self, v:str):
+		# (entry, stale) or None, entry as returned by scrape()
+		db = self.connect()
+		with self.lock:
+			r = db.execute("SELECT trans,extend,imp_tu,d,html,parser,fetched FROM pages WHERE verb=?", (v,)).fetchone()
+			if r is None: return None
+			tr,ext,imp,d,html,parser,t = r
+			if parser != PARSER and html is not None:
+				s = zlib.decompress(html).decode()
+				x = scrape(v, s)
+				self.put(v, x, s, t)
 			else:
-				print(f"Ignoring line on {h3}|{h4}: {line}")
-
-		if tr == "(none)": tr = None
-		super().__init__(v, tr, False, False, None, d)
-		P = self.present()
-		if self.type == "a":
-			if P[0][-2:] == "ez" or P[5][-3:] == "ază":
-				self.extend = True
-		elif self.type == "i":
-			if P[0][-3:] == "esc" or P[5][-3:] == "esc":
-				self.extend = True
-		elif self.type == "î":
-			if P[0][-3:] == "ăsc" or P[5][-3:] == "ăsc":
-				self.extend = True
-		C = self.conjunctive()
-		if C[2] != P[4] and C[2] == P[2]: self.imp_tu = True
+				x = (tr, bool(ext), bool(imp), json.loads(d))
+				db.execute("UPDATE pages SET used=? WHERE verb=?", (int(time.time()), v))
+				db.commit()
+		return x, t < time.time() - CACHE_DAYS*86400
 
+	def has(self, v:str) -> bool:
+		db = self.connect()
+		with self.lock:
+			return db.execute("SELECT 1 FROM pages WHERE verb=?", (v,)).fetchone() is not None
 
+	def fresh(self, v:str) -> bool:
+		db = self.connect()
+		with self.lock:
+			r = db.execute("SELECT fetched FROM pages WHERE verb=?", (v,)).fetchone()
+		return r is not None and r[0] >= time.time() - CACHE_DAYS*86400
+
+	def put(self, v:str, x, s:str, t:int=None):
+		tr,ext,imp,d = x
+		d = json.dumps(d, ensure_ascii=False)
+		html = zlib.compress(s.encode(), 9) if CACHE_HTML else None
+		now = int(time.time())
+		db = self.connect()
+		with self.lock:
+			db.execute("REPLACE INTO pages VALUES (?,?,?,?,?,?,?,?,?,?)",
+				(v, tr, ext, imp, d, html, PARSER, t or now, now,
+				len(d.encode()) + len(tr or "") + len(html or b"")))
+			self.evict(v)
+			db.commit()
+
+	def evict(self, keep:str):
+		# drops least recently used pages until we are below CACHE_MB
+		db = self.db
+		n = db.execute("SELECT SUM(size) FROM pages").fetchone()[0] or 0
+		if n <= CACHE_MB*1024*1024: return
+		X = []
+		for v,k in db.execute("SELECT verb,size FROM pages ORDER BY used ASC"):
+			if n <= CACHE_MB*1024*1024: break
+			if v == keep: continue
+			X.append((v,))
+			n -= k
+		db.executemany("DELETE FROM pages WHERE verb=?", X)
+		db.execute("PRAGMA incremental_vacuum")
+
+	def pages(self):
+		# (verb, raw page) for all pages we kept
+		db = self.connect()
+		for v,html in db.execute("SELECT verb,html FROM pages WHERE html IS NOT NULL").fetchall():
+			yield v, zlib.decompress(html).decode()
+
+	def stats(self):
+		db = self.connect()
+		t0 = time.time() - CACHE_DAYS*86400
+		n,k,h,stale,a,b = db.execute("""SELECT COUNT(*), SUM(size), SUM(LENGTH(html)),
+			SUM(fetched < ?), MIN(fetched), MAX(fetched) FROM pages""", (t0,)).fetchone()
+		nh = db.execute("SELECT COUNT(*) FROM pages WHERE html IS NOT NULL").fetchone()[0]
+		mb = lambda x: f"{(x or 0)/1024:.1f} kB" if (x or 0) < 1024*1024 else f"{x/(1024*1024):.1f} MB"
+		day = lambda x: "-" if x is None else time.strftime("%Y-%m-%d", time.localtime(x))
+		print(f"file:    {self.path} ({mb(os.path.getsize(self.path))})")
+		print(f"pages:   {n} ({stale or 0} stale, {nh} with html)")
+		print(f"size:    {mb(k)} of {mb(CACHE_MB*1024*1024)} ({mb(h)} html)")
+		print(f"fetched: {day(a)} to {day(b)}, refreshed after {CACHE_DAYS:g} days")
+
+cache = Cache(os.path.join(CACHE, "cache.sqlite"))
+
+def entry(v:str):
+	# (translation, extend, imp_tu, overrides) for v, from the cache if
+	# possible, stale pages are fetched again if we can
+	r = cache.get(v)
+	if r is not None and not r[1]: return r[0]
+	try:
+		s = fetcher.fetch(v)
+	except Exception as e:
+		if r is None: raise
+		eprint(f"refreshing {v} failed: {e}")
+		return r[0]
+	x = scrape(v, s)
+	cache.put(v, x, s)
+	return x
+
+class WVerb(DVerb):
+	def __init__(self, v:str):
+		v = check(v)
+		tr,ext,imp,d = entry(v)
+		super().__init__(v, tr, ext, imp, None, d)
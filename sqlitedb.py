@@ -0,0 +1,35 @@
+#!/usr/bin/python
+# sqlite connections for vom and tt
+#
+# The databases are in WAL mode, so a status bar asking vom i or tt i
+# neither waits for nor blocks a quiz or a project switch that is writing,
+# and writers wait up to BUSY seconds for each other instead of failing with
+# "database is locked". Schema changes are a list of migrations, functions
+# of the connection: user_version is the number already applied.
+import sqlite3
+
+BUSY    = 5.0 # seconds
+CACHED  = 256 # prepared statements kept per connection
+
+def connect(path:str, migrations:list=()):
+	db = sqlite3.connect(path, timeout=BUSY, cached_statements=CACHED)
+	db.row_factory = sqlite3.Row
+	db.execute("PRAGMA journal_mode=WAL")
+	db.execute("PRAGMA synchronous=NORMAL") # durable enough with WAL
+	migrate(db, migrations)
+	return db
+
+def version(db) -> int:
+	return db.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(db, migrations:list):
+	# applies the migrations that are missing, all in one transaction
+	if version(db) >= len(migrations): return
+	db.execute("BEGIN IMMEDIATE") # and check again, someone could have been faster
+	try:
+		for m in migrations[version(db):]: m(db)
+		db.execute(f"PRAGMA user_version={len(migrations)}")
+		db.commit()
+	except:
+		db.rollback()
+		raise
@@ -0,0 +1,3 @@
+# the modules and scripts are in the directory above
+import os, sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
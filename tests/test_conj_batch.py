@@ -0,0 +1,39 @@
+import io, json
+import conj_batch
+
+FIELDS = ["gerund", "perfect", "present", "future"]
+PERSONS = ["yo", "tú", "él"]
+
+def record(s):
+	# module level, so the process pool can pickle it
+	if s == "nada": return (s, None, None, None)
+	return (s, "t " + s, "p" if s[0] == "a" else None, (s+"ndo", None, [s+"1", None, s+"3"], [s+"4", "x\ty", ""]))
+
+def test_dict_roundtrip():
+	r = record("ama")
+	D = conj_batch.to_dict(r, FIELDS, PERSONS)
+	assert D["verb"] == "ama" and D["parent"] == "p" and D["forms"]["present"]["tú"] is None
+	assert conj_batch.from_dict(json.loads(json.dumps(D)), FIELDS, PERSONS) == list(r[3][:2]) + [list(x) for x in r[3][2:]]
+	assert conj_batch.to_dict(record("nada"), FIELDS, PERSONS) == {"verb": "nada", "error": "not found"}
+
+def test_tsv():
+	H = conj_batch.header(FIELDS, PERSONS, 2)
+	assert H[:5] == ["verb", "translation", "parent", "gerund", "perfect"] and len(H) == 5 + 2*len(PERSONS)
+	for s in ["ama", "nada"]:
+		R = conj_batch.to_tsv(record(s), len(H)).split("\t")
+		assert len(R) == len(H)
+	assert conj_batch.to_tsv(record("ama"), len(H)).split("\t")[-2] == "x y"
+
+def run(fmt, jobs):
+	out = io.StringIO()
+	conj_batch.run(io.StringIO("ama\n\n# comment\n  beber  \nnada\n" + "".join(f"v{i}\n" for i in range(200))),
+		record, FIELDS, PERSONS, 2, fmt, jobs, out)
+	return out.getvalue().splitlines()
+
+def test_run():
+	J = run("json", 1)
+	assert [json.loads(l)["verb"] for l in J] == ["ama", "beber", "nada"] + [f"v{i}" for i in range(200)]
+	assert run("json", 3) == J
+	T = run("tsv", 2)
+	assert T[0].split("\t")[0] == "verb" and [l.split("\t")[0] for l in T[1:4]] == ["ama", "beber", "nada"]
+	assert len({len(l.split("\t")) for l in T}) == 1
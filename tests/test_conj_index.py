@@ -0,0 +1,55 @@
+import random, functools
+from conj_index import *
+
+def words(n, seed=0, A="abcde"):
+	# a small alphabet, so suffixes and distances are shared a lot
+	R = random.Random(seed)
+	return sorted({"".join(R.choice(A) for i in range(R.randint(1, 7))) for j in range(n)})
+
+def levenshtein(a, b):
+	@functools.cache
+	def d(i, j):
+		if i == 0 or j == 0: return i+j
+		return min(d(i-1, j)+1, d(i, j-1)+1, d(i-1, j-1) + (a[i-1] != b[j-1]))
+	return d(len(a), len(b))
+
+def suffix(a, b):
+	n = 0
+	while n < min(len(a), len(b)) and a[-1-n] == b[-1-n]: n += 1
+	return n
+
+def test_distance():
+	W = words(60)
+	for a in W:
+		for b in W: assert distance(a, b) == levenshtein(a, b)
+	assert distance("", "abc") == 3
+	assert distance("tener", "tenir") == 1
+
+def test_bktree():
+	W = words(500)
+	T = BKTree(W)
+	S = StoredBKTree(T.table().get)
+	for w in words(50, 1) + W[:20]:
+		D = [(levenshtein(w, x), x) for x in W]
+		for n in range(4):
+			B = sorted((d, x) for d,x in D if d <= n)
+			assert T.search(w, n) == B
+			assert S.search(w, n) == B
+	assert BKTree().search("a", 2) == []
+
+def test_bktree_duplicates():
+	T = BKTree(["da", "da", "la"])
+	assert T.search("da", 0) == [(0, "da")]
+
+def test_suffix_trie():
+	W = words(500)
+	T = SuffixTrie(W + W[:10])
+	assert len(T) == len(W)
+	for w in words(50, 1) + W[:20]:
+		assert T.ends(w) == sorted((x for x in W if w.endswith(x)), key=len, reverse=True)
+		for n in range(1, 4):
+			C = list(T.common(w, n))
+			assert sorted(C) == sorted((x, suffix(w, x)) for x in W if suffix(w, x) >= n)
+			assert [k for x,k in C] == sorted((k for x,k in C), reverse=True)
+			m = max((suffix(w, x) for x in W if x != w and suffix(w, x) >= n), default=None)
+			assert sorted(T.longest(w, n)) == sorted(x for x in W if x != w and suffix(w, x) == m)
@@ -0,0 +1,59 @@
+import os, random, pytest
+from conj_store import *
+
+def store(tmp_path, tables, hashed=set()):
+	src = tmp_path / "source.py"
+	if not src.exists(): src.write_text("x = 1\n")
+	S = Store("test", [str(src)])
+	S.path = str(tmp_path / "paradigms.bin")
+	S.build(tables, hashed)
+	S.tables = None
+	assert S.open()
+	return S
+
+def words(n, seed=0):
+	R = random.Random(seed)
+	A = "abcdefghijklmnopqrstuvwxyzáéíóúñăâîșț"
+	return {"".join(R.choice(A) for i in range(R.randint(1, 12))) for j in range(n)}
+
+def test_sorted_roundtrip(tmp_path):
+	W = words(2000)
+	T = {w: f"value of {w}\n\t{len(w)}" for w in W}
+	S = store(tmp_path, {"verbs": T})
+	for w,v in T.items(): assert S.get(w) == v
+	for w in words(200, 1) - W: assert S.get(w) is None
+
+def test_hashed_roundtrip(tmp_path):
+	W = words(2000)
+	T = {w: w.upper() for w in W}
+	S = store(tmp_path, {"verbs": {"x": "y"}, "forms": T}, {"forms"})
+	for w,v in T.items(): assert S.get(w, "forms") == v
+	for w in words(200, 1) - W: assert S.get(w, "forms") is None
+	assert S.get("x") == "y"
+
+def test_prefixed(tmp_path):
+	W = words(2000)
+	S = store(tmp_path, {"verbs": {w: w for w in W}, "forms": {w: w for w in W}}, {"forms"})
+	for p in ["", "a", "ab", "ñ", "zz", "ăâ"]:
+		assert list(S.tables["verbs"].prefixed(p)) == sorted(((w,w) for w in W if w.startswith(p)), key=lambda x: x[0].encode())
+	with pytest.raises(TypeError): list(S.tables["forms"].prefixed("a"))
+
+def test_empty_table(tmp_path):
+	S = store(tmp_path, {"verbs": {}, "forms": {}}, {"forms"})
+	assert S.get("a") is None
+	assert S.get("a", "forms") is None
+	assert list(S.tables["verbs"].prefixed("")) == []
+
+def test_stale(tmp_path):
+	S = store(tmp_path, {"verbs": {"a": "b"}})
+	S.tables = None
+	src = tmp_path / "source.py"
+	src.write_text("x = 22\n")
+	assert not S.open()
+
+def test_pack_verb():
+	F = ["gerund", None, ["a", None, "c"], ["", "x"]]
+	tr,P,f,G = unpack_verb(pack_verb("give", "da", 3, F), 2)
+	assert (tr, P, f) == ("give", "da", 3)
+	assert G == ["gerund", None, ["a", None, "c"], [None, "x"]]
+	assert unpack_verb(pack_verb(None, None, 0, ["a", "b"]), 2)[:2] == (None, None)
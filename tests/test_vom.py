@@ -0,0 +1,100 @@
+import os, time, fcntl, pytest
+
+def load_vom():
+	# vom is a script: only run its definitions, not the command line
+	p = os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "vom")
+	src = open(p).read()
+	src = src[:src.index("########################################################################\n# Commandline parsing")]
+	G = {"__name__": "vom"}
+	exec(compile(src, p, "exec"), G)
+	return G
+
+@pytest.fixture
+def vom(tmp_path):
+	V = load_vom()
+	f = str(tmp_path / "de-es.sqlite")
+	V["open_db"](f)
+	V["db"].executemany("INSERT INTO data (a,b) VALUES (?,?)", [("Haus", "casa"), ("Hund", "perro")])
+	V["db"].commit()
+	return V
+
+def crash(V):
+	# the session dies: uncommitted work is gone, the lock with the process
+	V["J"].F.close()
+	V["db"].close()
+
+def buckets(V):
+	return [r[0] for r in V["db"].execute("SELECT a_bucket FROM data ORDER BY id")]
+
+def test_journal_commits(vom):
+	J = vom["J"] = vom["Journal"]()
+	J.put("UPDATE data SET a_bucket=? WHERE id=?", (3, 1))
+	J.close()
+	assert not os.path.exists(vom["db_path"] + ".journal")
+	vom["open_db"](vom["db_path"])
+	assert buckets(vom) == [3, 0]
+
+def test_journal_replay(vom):
+	J = vom["J"] = vom["Journal"]()
+	for i in range(vom["BATCH"] + 3): # one batch committed, three not
+		J.put("UPDATE data SET a_bucket=? WHERE id=?", (i, 1 + i%2))
+	J.put(vom["REVIEW"], ("a", 1, 1000, 1, 0))
+	crash(vom)
+	f = vom["db_path"]
+	assert os.path.getsize(f + ".journal") > 0
+	vom["open_db"](f)
+	n = vom["BATCH"] + 2
+	assert buckets(vom) == [n, n-1]
+	assert not os.path.exists(f + ".journal")
+	assert vom["db"].execute("SELECT COUNT(*) FROM reviews").fetchone()[0] == 1
+
+def test_journal_replay_cut_off(vom):
+	J = vom["J"] = vom["Journal"]()
+	J.put("UPDATE data SET a_bucket=? WHERE id=?", (7, 1))
+	J.F.write('["UPDATE data SET a_bucket=? WHERE id=?", [9, ')
+	crash(vom)
+	vom["open_db"](vom["db_path"])
+	assert buckets(vom) == [7, 0]
+
+def test_journal_live_session(vom):
+	# a second connection must neither replay nor remove a running session's journal
+	J = vom["J"] = vom["Journal"]()
+	J.put("UPDATE data SET a_bucket=? WHERE id=?", (5, 1))
+	db = vom["db"]
+	vom["open_db"](vom["db_path"])
+	assert os.path.exists(vom["db_path"] + ".journal")
+	with pytest.raises(SystemExit): vom["Journal"]()
+	vom["db"] = db
+	J.close()
+	vom["open_db"](vom["db_path"])
+	assert buckets(vom) == [5, 0]
+
+def test_review_replay_counts_once(vom):
+	R = (vom["REVIEW"], ("b", 2, 1000, 0, 4))
+	J = vom["J"] = vom["Journal"]()
+	J.put(*R)
+	J.commit()
+	J.F.write(__import__("json").dumps(list(R)) + "\n") # committed, but still in the journal
+	J.F.flush()
+	crash(vom)
+	vom["open_db"](vom["db_path"])
+	db = vom["db"]
+	assert db.execute("SELECT COUNT(*) FROM reviews").fetchone()[0] == 1
+	assert tuple(db.execute("SELECT n,ok FROM review_buckets WHERE bucket=4").fetchone()) == (1, 0)
+
+def test_queue(vom):
+	Queue = vom["Queue"]
+	now = time.time()
+	rows = [{"id": i, "t": t} for i,t in enumerate([0, 10, 20, now-1, now+1000])]
+	Q = Queue(rows, "t", 100)
+	assert len(Q) == 4 # the one at now-1 is due by now
+	assert sorted(Q.pop()["id"] for i in range(4)) == [0, 1, 2, 3]
+	assert Q.pop() is None and len(Q.H) == 1
+
+def test_queue_ordered(vom):
+	Queue = vom["Queue"]
+	now = time.time()
+	rows = [{"id": i, "t": t} for i,t in enumerate([20, 0, now-2, 10, now+1000])]
+	Q = Queue(rows, "t", 100, True)
+	assert [Q.pop()["id"] for i in range(4)] == [1, 3, 0, 2]
+	assert Q.pop() is None